@@ -0,0 +1,6 @@
+import sys
+from videotohash.stream import main
+
+if __name__ == '__main__':
+    # '-' lê do stdin; um diretório é lido como segmentos; um arquivo é seguido enquanto cresce
+    main(sys.argv[1] if len(sys.argv) > 1 else '-')
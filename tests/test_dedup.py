@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from videotohash import dedup
+from videotohash.dedup import (auto_tables, bucket_candidates, collision_probability, key_bits, sample_key,
+                               table_positions, verify_pairs)
+
+
+def pairs(first, second):
+    return {tuple(sorted(pair)) for pair in zip(first.tolist(), second.tolist())}
+
+
+@pytest.fixture
+def catalogue():
+    """Monta um catálogo com os Hashes de cada vídeo e o instala como nos workers do pool."""
+    def make(hashes_per_file):
+        blocks_per_file = np.array([len(h) for h in hashes_per_file], dtype=np.int64)
+        data = {
+            "Files": [f"video{v}.json" for v in range(len(hashes_per_file))],
+            "Blocks per File": blocks_per_file,
+            "Offsets": np.cumsum(blocks_per_file) - blocks_per_file,
+            "Hash": np.array([h for file_hashes in hashes_per_file for h in file_hashes], dtype=np.uint64),
+        }
+        dedup._init_worker(data)
+        return data
+    yield make
+    dedup._init_worker(None)
+
+
+def test_bucket_candidates_pares_do_mesmo_balde():
+    keys = np.array([5, 7, 5, 9, 5, 7], dtype=np.uint64)
+    first, second = bucket_candidates(keys, max_bucket=10)
+    assert pairs(first, second) == {(0, 2), (0, 4), (2, 4), (1, 5)}
+
+
+def test_bucket_candidates_ignora_baldes_grandes():
+    keys = np.array([1, 1, 1, 2, 2], dtype=np.uint64)
+    first, second = bucket_candidates(keys, max_bucket=2)
+    assert pairs(first, second) == {(3, 4)}
+
+
+def test_bucket_candidates_sem_colisoes():
+    first, second = bucket_candidates(np.arange(10, dtype=np.uint64))
+    assert len(first) == len(second) == 0
+
+
+def test_sample_key_extrai_bits_nas_posicoes():
+    values = np.array([0, 1 << 63, (1 << 8) | 1, 0xFFFFFFFFFFFFFFFF], dtype=np.uint64)
+    keys = sample_key(values, np.array([0, 8, 63]))
+    assert keys.tolist() == [0b000, 0b100, 0b011, 0b111]
+
+
+def test_sample_key_confere_com_laco_python():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 2**64, size=200, dtype=np.uint64)
+    positions = table_positions(1, 20, seed=3)[0]
+    expected = [sum(((int(v) >> int(p)) & 1) << i for i, p in enumerate(positions)) for v in values]
+    assert sample_key(values, positions).tolist() == expected
+
+
+def test_auto_tables_atinge_o_recall():
+    bits = key_bits(300_000)
+    tables = auto_tables(300_000, 16, recall=0.5)
+    missed = (1 - collision_probability(16, bits)) ** tables
+    assert 1 - missed >= 0.5
+    assert 1 - (1 - collision_probability(16, bits)) ** (tables - 1) < 0.5
+
+
+def test_auto_tables_cresce_com_a_distancia_e_o_recall():
+    assert auto_tables(10_000, 8) < auto_tables(10_000, 16)
+    assert auto_tables(10_000, 16, recall=0.5) < auto_tables(10_000, 16, recall=0.9)
+    assert auto_tables(10_000, 0) == 1
+
+
+def test_verify_pairs_conta_blocos_com_par(catalogue):
+    original = [0x0, 0xFF00, 0xFFFF0000, 0xFFFF_FFFF_0000_0000]
+    copy = [h ^ 1 for h in original[:3]]
+    other = [0x5555_5555_5555_5555, 0xAAAA_AAAA_AAAA_AAAA]
+    data = catalogue([original, copy, other])
+    n_files = len(data["Files"])
+    pair_keys = np.array([0 * n_files + 1, 0 * n_files + 2], dtype=np.int64)
+    matched_a, matched_b = verify_pairs(pair_keys, threshold_bits=4)
+    # 0 x 1: três blocos de cada lado têm par; 0 x 2: nenhum
+    assert matched_a.tolist() == [3, 0]
+    assert matched_b.tolist() == [3, 0]
+
+
+def test_verify_pairs_respeita_o_limite(catalogue):
+    catalogue([[0x0], [0b111]])
+    pair_keys = np.array([1], dtype=np.int64)
+    assert [m.tolist() for m in verify_pairs(pair_keys, threshold_bits=3)] == [[1], [1]]
+    assert [m.tolist() for m in verify_pairs(pair_keys, threshold_bits=2)] == [[0], [0]]
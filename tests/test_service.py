@@ -0,0 +1,40 @@
+import threading
+
+from videotohash.service import MemoryBudget
+
+
+def test_memory_budget_reserva_e_libera():
+    budget = MemoryBudget(100)
+    assert budget.acquire(60) == 60
+    assert budget.acquire(40) == 40
+    assert budget.used == 100
+    budget.release(60)
+    budget.release(40)
+    assert budget.used == 0
+
+
+def test_memory_budget_bloco_maior_que_o_orcamento_nao_trava():
+    budget = MemoryBudget(100)
+    assert budget.acquire(500) == 100
+    assert budget.used == 100
+    budget.release(100)
+    assert budget.used == 0
+
+
+def test_memory_budget_espera_ate_haver_espaco():
+    budget = MemoryBudget(100)
+    first = budget.acquire(80)
+    acquired = threading.Event()
+
+    def second():
+        budget.release(budget.acquire(50))
+        acquired.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    # Não cabe enquanto os 80 bytes estão reservados
+    assert not acquired.wait(0.2)
+    budget.release(first)
+    assert acquired.wait(5)
+    thread.join(5)
+    assert budget.used == 0
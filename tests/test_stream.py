@@ -0,0 +1,43 @@
+from videotohash.stream import natural_key, read_playlists, segment_order
+
+
+def touch(directory, *names):
+    for name in names:
+        (directory / name).write_bytes(b'')
+
+
+def test_natural_key_compara_numeros_como_numeros():
+    names = ['seg10.ts', 'seg2.ts', 'seg1.ts', 'seg100.ts']
+    assert sorted(names, key=natural_key) == ['seg1.ts', 'seg2.ts', 'seg10.ts', 'seg100.ts']
+
+
+def test_natural_key_sem_numeros():
+    assert sorted(['b.ts', 'a.ts'], key=natural_key) == ['a.ts', 'b.ts']
+
+
+def test_read_playlists_ordem_da_playlist_e_endlist(tmp_path):
+    (tmp_path / 'index.m3u8').write_text(
+        "#EXTM3U\n#EXTINF:2.0,\nsegB.ts\n#EXTINF:2.0,\nhttp://cdn/live/segA.ts?token=1\n"
+        "#EXTINF:2.0,\nsegB.ts\n#EXT-X-ENDLIST\n")
+    assert read_playlists(tmp_path) == (['segB.ts', 'segA.ts'], True)
+
+
+def test_read_playlists_sem_endlist(tmp_path):
+    (tmp_path / 'index.m3u8').write_text("#EXTM3U\nseg0.ts\n")
+    assert read_playlists(tmp_path) == (['seg0.ts'], False)
+
+
+def test_read_playlists_sem_playlist(tmp_path):
+    assert read_playlists(tmp_path) == ([], False)
+
+
+def test_segment_order_sem_playlist_usa_ordem_natural(tmp_path):
+    touch(tmp_path, 'seg10.ts', 'seg2.ts', 'seg1.ts', 'notas.txt')
+    assert segment_order(tmp_path) == (['seg1.ts', 'seg2.ts', 'seg10.ts'], False)
+
+
+def test_segment_order_playlist_primeiro_depois_o_resto(tmp_path):
+    touch(tmp_path, 'seg1.ts', 'seg2.ts', 'seg3.ts', 'seg10.ts')
+    # seg9.ts está na playlist mas ainda não chegou ao disco
+    (tmp_path / 'index.m3u8').write_text("seg3.ts\nseg1.ts\nseg9.ts\n#EXT-X-ENDLIST\n")
+    assert segment_order(tmp_path) == (['seg3.ts', 'seg1.ts', 'seg2.ts', 'seg10.ts'], True)
@@ -0,0 +1,44 @@
+import pytest
+
+from videotohash.verify import SequentialTest, spread_order
+
+
+@pytest.mark.parametrize('total', [0, 1, 2, 3, 7, 16, 100])
+def test_spread_order_e_permutacao(total):
+    assert sorted(spread_order(total)) == list(range(total))
+
+
+def test_spread_order_comeca_pelas_pontas_e_bissecta():
+    assert spread_order(9) == [0, 8, 4, 2, 6, 1, 3, 5, 7]
+
+
+def test_spread_order_vazio_e_um_bloco():
+    assert spread_order(0) == []
+    assert spread_order(-3) == []
+    assert spread_order(1) == [0]
+
+
+def test_sequential_test_decide_match():
+    test = SequentialTest(confidence=0.99)
+    decisions = [test.update(True) for _ in range(3)]
+    assert decisions == [None, None, 'match']
+
+
+def test_sequential_test_decide_mismatch():
+    test = SequentialTest(confidence=0.99)
+    decisions = [test.update(False) for _ in range(3)]
+    assert decisions == [None, None, 'mismatch']
+
+
+def test_sequential_test_blocos_divergentes_se_cancelam():
+    test = SequentialTest(confidence=0.99)
+    for matched in (True, False) * 10:
+        test.update(matched)
+    assert test.score == pytest.approx(0.0)
+    assert test.decision is None
+
+
+@pytest.mark.parametrize('confidence', [0.5, 0.3, 1, 1.5, 0])
+def test_sequential_test_recusa_confianca_fora_do_intervalo(confidence):
+    with pytest.raises(ValueError):
+        SequentialTest(confidence=confidence)
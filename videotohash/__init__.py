@@ -0,0 +1,8 @@
+"""
+VideoToHash: mosaicos de frames de vídeo e seus hashes perceptuais.
+
+Este módulo não importa cv2, numpy, imagehash, psutil nem dask; cada backend só
+carrega o que precisa quando é escolhido (veja videotohash.backends).
+"""
+
+__version__ = '0.1.0'
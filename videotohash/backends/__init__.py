@@ -0,0 +1,33 @@
+"""
+Backends de processamento, carregados sob demanda.
+
+Cada backend é um módulo com a função
+
+    encode_frames(video_path, W_res, H_res, imageCount, escolha, on_block=None, **options)
+
+que retorna (hashes, total_frames), onde hashes é a lista de
+{"HashPointer": ..., "Hash": ...} em ordem de bloco. on_block(p, hash_pointer, img_hash)
+é chamado assim que cada bloco fica pronto. As opções comuns são workers, source
+('opencv', 'ffmpeg' ou 'pyav', veja videotohash.sources), gray, fps, decode_threads e
+archive/tile_format (tiles do mosaico, veja videotohash.tiles); o backend thread aceita
+também max_in_flight.
+
+O módulo só é importado em get_backend(), então escolher o backend serial não
+paga o import do dask (nem o contrário).
+"""
+import importlib
+
+BACKENDS = {
+    'serial': 'videotohash.backends.serial',
+    'thread': 'videotohash.backends.thread',
+    'process': 'videotohash.backends.process',
+    'dask': 'videotohash.backends.dask_cluster',
+}
+
+def get_backend(name):
+    """Importa e retorna o módulo do backend name."""
+    try:
+        module = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend desconhecido: {name} (opções: {', '.join(BACKENDS)})") from None
+    return importlib.import_module(module)
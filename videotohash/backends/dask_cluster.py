@@ -0,0 +1,479 @@
+"""
+Backend Dask: cada bloco é dividido em tarefas pequenas cujos parciais são
+reduzidos em árvore no cluster, e os workers leem o vídeo do armazenamento
+compartilhado através de um cache local de pedaços (ChunkCache).
+
+Os workers precisam conseguir importar o pacote videotohash.
+"""
+import io
+import os
+import math
+import functools
+import hashlib
+import threading
+import concurrent.futures
+import cv2
+import numpy as np
+import imagehash
+from PIL import Image
+
+from dask.distributed import Client, as_completed
+
+from ..config import NUM_COLUMNS
+from ..mosaic import count_frames, hash_image
+
+# Tamanho ao qual cada hash reduz a imagem antes de calcular (imagehash: convert('L')
+# e resize(..., LANCZOS))
+HASH_SIZES = {'1': (32, 32), '2': (8, 8), '3': (9, 8)}
+# Ponto fixo dos coeficientes do resize do Pillow
+PRECISION_BITS = 32 - 8 - 2
+ONE = 1 << PRECISION_BITS
+# Lado do MCU do JPEG com croma 4:2:0 (padrão do cv2.imencode)
+JPEG_MCU = 16
+
+# Cache local de pedaços do vídeo em cada worker (evita leituras aleatórias no /mnt/comp)
+CACHE_DIR = '/tmp/videocache'
+# Tamanho de cada pedaço copiado do armazenamento compartilhado
+CHUNK_SIZE = 4 * 1024 * 1024
+# Espaço máximo do cache local; os pedaços menos usados recentemente são apagados
+CACHE_MAX_BYTES = 20 * 1024 * 1024 * 1024
+# Quantos pedaços à frente são buscados em segundo plano durante a leitura
+PREFETCH_CHUNKS = 2
+
+class _Entry:
+    def __init__(self, path):
+        st = os.stat(path)
+        self.path = path
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+
+class ChunkCache:
+    """
+    Cache em disco local, no worker, de pedaços de tamanho fixo de arquivos remotos.
+
+    Cada pedaço é lido do armazenamento compartilhado uma única vez, gravado em
+    CACHE_DIR e servido do disco local nas leituras seguintes (inclusive por outros
+    workers da mesma máquina). Quando o cache passa de max_bytes, os pedaços com
+    acesso mais antigo são apagados.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, chunk_size=CHUNK_SIZE, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.fetching = {}
+        self.prefetcher = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.used = sum(entry.size for entry in self._entries())
+
+    def _entries(self):
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith('.chunk'):
+                    try:
+                        yield _Entry(os.path.join(root, name))
+                    except FileNotFoundError:
+                        pass
+
+    def key(self, path):
+        """Identifica o arquivo pelo caminho, tamanho e data de modificação."""
+        st = os.stat(path)
+        raw = f'{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}'
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, path, key, index):
+        """Retorna os bytes do pedaço index, buscando no arquivo remoto se necessário."""
+        local = os.path.join(self.cache_dir, key, f'{index}.chunk')
+        try:
+            with open(local, 'rb') as f:
+                data = f.read()
+            os.utime(local)
+            return data
+        except FileNotFoundError:
+            pass
+
+        # Só uma thread do worker busca cada pedaço; as outras esperam o resultado
+        with self.lock:
+            event = self.fetching.get(local)
+            owner = event is None
+            if owner:
+                event = self.fetching[local] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.get(path, key, index)
+
+        try:
+            with open(path, 'rb') as f:
+                f.seek(index * self.chunk_size)
+                data = f.read(self.chunk_size)
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            tmp = f'{local}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, local)
+            with self.lock:
+                self.used += len(data)
+                over = self.used > self.max_bytes
+            if over:
+                self.evict()
+        finally:
+            with self.lock:
+                del self.fetching[local]
+            event.set()
+        return data
+
+    def prefetch(self, path, key, first, last):
+        """Agenda em segundo plano a busca dos pedaços first..last (inclusive)."""
+        for index in range(first, last + 1):
+            local = os.path.join(self.cache_dir, key, f'{index}.chunk')
+            if not os.path.exists(local) and local not in self.fetching:
+                self.prefetcher.submit(self.get, path, key, index)
+
+    def evict(self):
+        """Apaga os pedaços com acesso mais antigo até voltar para 90% de max_bytes."""
+        with self.lock:
+            entries = sorted(self._entries(), key=lambda e: e.mtime)
+            used = sum(e.size for e in entries)
+            for entry in entries:
+                if used <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(entry.path)
+                    used -= entry.size
+                except FileNotFoundError:
+                    pass
+            self.used = used
+
+class CachedVideoFile(io.BufferedIOBase):
+    """
+    Arquivo somente leitura que serve os bytes do vídeo remoto a partir do ChunkCache.
+
+    O cv2.VideoCapture aceita um io.BufferedIOBase, então o decoder faz seus seeks
+    no cache local em vez de no armazenamento compartilhado.
+    """
+
+    def __init__(self, path, cache):
+        self.path = path
+        self.cache = cache
+        self.key = cache.key(path)
+        self.size = os.path.getsize(path)
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.pos
+        end = min(self.pos + size, self.size)
+        chunk_size = self.cache.chunk_size
+        parts = []
+        while self.pos < end:
+            index = self.pos // chunk_size
+            data = self.cache.get(self.path, self.key, index)
+            offset = self.pos - index * chunk_size
+            part = data[offset:offset + end - self.pos]
+            if not part:
+                break
+            parts.append(part)
+            self.pos += len(part)
+        if parts:
+            last_chunk = (self.size - 1) // chunk_size
+            index = (self.pos - 1) // chunk_size
+            self.cache.prefetch(self.path, self.key, index + 1, min(index + PREFETCH_CHUNKS, last_chunk))
+        return b''.join(parts)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Retorna o ChunkCache do processo worker, criando-o no primeiro uso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChunkCache()
+        return _cache
+
+def open_video(video_path, use_cache=True):
+    """
+    Abre o vídeo através do cache local do worker.
+
+    Versões do OpenCV sem suporte a leitura de streams Python caem para a abertura
+    direta do arquivo.
+    """
+    if use_cache:
+        try:
+            cap = cv2.VideoCapture(CachedVideoFile(video_path, get_cache()), cv2.CAP_FFMPEG, [])
+            if cap.isOpened():
+                return cap
+        except (TypeError, cv2.error):
+            pass
+    return cv2.VideoCapture(video_path)
+
+def prefetch_video(video_path, start_frame, end_frame, total_frames):
+    """
+    Aquece o cache do worker com a faixa de bytes estimada para os frames dados.
+
+    A estimativa é proporcional à posição do frame no arquivo, mais o primeiro
+    pedaço (cabeçalho) e o último (o moov de MP4 costuma ficar no fim).
+    """
+    cache = get_cache()
+    size = os.path.getsize(video_path)
+    key = cache.key(video_path)
+    last_chunk = (size - 1) // cache.chunk_size
+    first = max(0, int(size * start_frame / max(total_frames, 1)) // cache.chunk_size - 1)
+    last = min(last_chunk, int(size * end_frame / max(total_frames, 1)) // cache.chunk_size + 1)
+    for index in sorted({0, last_chunk, *range(first, last + 1)}):
+        cache.get(video_path, key, index)
+
+def _lanczos(x):
+    """Filtro LANCZOS (a = 3) como no Pillow."""
+    def sinc(v):
+        if v == 0.0:
+            return 1.0
+        v = v * math.pi
+        return math.sin(v) / v
+    if -3.0 <= x < 3.0:
+        return sinc(x) * sinc(x / 3)
+    return 0.0
+
+@functools.lru_cache(maxsize=8)
+def lanczos_coefficients(in_size, out_size):
+    """
+    Matriz (in_size, out_size) com os coeficientes em ponto fixo que o Pillow usa na
+    passada horizontal do resize(..., LANCZOS) (precompute_coeffs/normalize_coeffs).
+
+    Pixels e coeficientes são inteiros, então o produto em float64 é exato e a soma
+    pode ser feita em qualquer ordem, por pedaços do mosaico.
+    """
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = 3.0 * filterscale
+    coefficients = np.zeros((in_size, out_size))
+    for xx in range(out_size):
+        center = (xx + 0.5) * scale
+        xmin = max(int(center - support + 0.5), 0)
+        xmax = min(int(center + support + 0.5), in_size) - xmin
+        weights = [_lanczos((x + xmin - center + 0.5) / filterscale) for x in range(xmax)]
+        total = 0.0
+        for w in weights:
+            total += w
+        for x, w in enumerate(weights):
+            if total != 0.0:
+                w = w / total
+            coefficients[xmin + x, xx] = int(-0.5 + w * ONE) if w < 0 else int(0.5 + w * ONE)
+    return coefficients
+
+def jpeg_luma(frame, y0, x0):
+    """
+    Luma (convert('L') do PIL) de um pedaço de frame como ele sai do JPEG do mosaico.
+
+    O pedaço é codificado sozinho, com bordas replicadas em cima e à esquerda para que
+    os blocos de 16x16 do JPEG caiam na mesma fase que teriam no mosaico, na posição
+    (y0, x0). Só os pixels nas divisas entre frames diferem do JPEG do mosaico inteiro.
+    """
+    py, px = y0 % JPEG_MCU, x0 % JPEG_MCU
+    padded = cv2.copyMakeBorder(frame, py, 0, px, 0, cv2.BORDER_REPLICATE)
+    success, buffer = cv2.imencode('.jpg', padded)
+    if not success:
+        raise RuntimeError("Erro ao codificar o pedaço do mosaico")
+    with Image.open(io.BytesIO(buffer.tobytes())) as img:
+        return np.asarray(img.convert('L'))[py:, px:]
+
+def mosaic_partial(start_frame, end_frame, block_start, block_frames, video_path, W_res, H_res, num_columns,
+                   escolha='1'):
+    """
+    Lê um pedaço pequeno de um bloco e devolve a redução parcial dos seus tiles.
+
+    Cada frame é levado para a sua posição no mosaico vertical (o mesmo layout do
+    np.array_split em num_columns faixas), passa pelo JPEG e pelo convert('L') como o
+    mosaico passaria, e suas linhas são reduzidas na largura pela passada horizontal
+    do LANCZOS do Pillow, antes do arredondamento. Essas somas são aditivas, então os
+    parciais de um bloco podem ser combinados em qualquer ordem.
+
+    Parâmetros:
+    - start_frame: Frame inicial deste pedaço.
+    - end_frame: Frame final (exclusivo) deste pedaço.
+    - block_start: Primeiro frame do bloco ao qual o pedaço pertence.
+    - block_frames: Número de frames do bloco inteiro.
+    - video_path: Caminho do vídeo de entrada.
+    - W_res: Largura da resolução para redimensionamento.
+    - H_res: Altura da resolução para redimensionamento.
+    - num_columns: Número de faixas do mosaico.
+    - escolha: Método de hash ('1' phash, '2' average, '3' dhash), que define a largura reduzida.
+
+    Retorna:
+    - Tupla (somas, frames, HashPointer): somas é um array float64 de
+      (num_columns * H_res, largura do hash); o HashPointer (pHash do primeiro frame do
+      bloco) só vem preenchido no pedaço que começa em block_start.
+    """
+    strip_width = block_frames * W_res // num_columns
+    out_w = HASH_SIZES.get(escolha, HASH_SIZES['1'])[0]
+    coefficients = lanczos_coefficients(strip_width, out_w)
+    sums = np.zeros((num_columns * H_res, out_w))
+    frames = 0
+    hash_pointer = None
+
+    cap = open_video(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    for i in range(start_frame, end_frame):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_resized = cv2.resize(frame, (W_res, H_res))
+        if i == block_start:
+            hash_pointer = str(imagehash.phash(Image.fromarray(frame_resized)))
+
+        # O frame pode atravessar a divisa entre duas faixas do mosaico
+        first_col = (i - block_start) * W_res
+        x = 0
+        while x < W_res:
+            strip, x0 = divmod(first_col + x, strip_width)
+            width = min(strip_width - x0, W_res - x)
+            luma = jpeg_luma(frame_resized[:, x:x + width], strip * H_res, x0)
+            sums[strip * H_res:(strip + 1) * H_res] += luma.astype(np.float64) @ coefficients[x0:x0 + width]
+            x += width
+        frames += 1
+    # Não usar cap.release(): com um stream Python o OpenCV libera o objeto sem o GIL
+    # e derruba o worker; o del libera a captura pelo coletor, com o GIL
+    del cap
+
+    return sums, frames, hash_pointer
+
+def combine_partials(a, b):
+    """Combina dois parciais do mesmo bloco (soma elemento a elemento)."""
+    return a[0] + b[0], a[1] + b[1], a[2] or b[2]
+
+def hash_partial(partial, escolha='1'):
+    """
+    Calcula o hash do bloco a partir do parcial já reduzido.
+
+    As somas viram a imagem intermediária do Pillow (arredondada e limitada a 0-255),
+    e o próprio Pillow faz a passada vertical do LANCZOS, então o hash recebe a mesma
+    imagem reduzida que receberia do frames_mosaic_{p}.jpg, a menos dos pixels nas
+    divisas entre frames (ver jpeg_luma).
+
+    Retorna:
+    - (HashPointer, Hash) como strings, ou None se o bloco não teve frames.
+    """
+    sums, frames, hash_pointer = partial
+    if not frames:
+        return None
+    rows = (sums.astype(np.int64) + ONE // 2) >> PRECISION_BITS
+    rows = np.clip(rows, 0, 255).astype(np.uint8)
+    size = HASH_SIZES.get(escolha, HASH_SIZES['1'])
+    img = Image.fromarray(rows).resize(size, Image.LANCZOS)
+    return hash_pointer, str(hash_image(img, escolha))
+
+def tree_reduce(client, futures):
+    """Reduz uma lista de futures de parciais em pares, formando uma árvore no cluster."""
+    while len(futures) > 1:
+        paired = [client.submit(combine_partials, futures[k], futures[k + 1])
+                  for k in range(0, len(futures) - 1, 2)]
+        if len(futures) % 2:
+            paired.append(futures[-1])
+        futures = paired
+    return futures[0]
+
+
+def encode_frames(video_path, W_res, H_res, imageCount, escolha, on_block=None, client=None, scheduler=None,
+                  frames_per_task=64, frames_per_segment=256, source='opencv', gray=False, fps=None, **options):
+    """
+    Divide cada bloco em pedaços pequenos, reduz os parciais em árvore e gera os hashes.
+
+    Cada tarefa lê só frames_per_task frames, então o paralelismo acompanha o número de
+    workers e não o número de blocos. Os hashes chegam via as_completed conforme cada
+    bloco termina.
+
+    O vídeo é dividido em segmentos de frames_per_segment frames; todas as tarefas de
+    um segmento são sugeridas ao mesmo worker (que também recebe um prefetch do trecho),
+    para que os bytes do segmento saiam do armazenamento compartilhado uma única vez.
+
+    Parâmetros:
+    - client: Cliente Dask já conectado; se None, conecta em scheduler (ou cria um
+      cluster local quando scheduler também é None).
+    - scheduler: Endereço do scheduler, ex. 'tcp://192.168.0.104:8786'.
+    - frames_per_task: Número de frames lidos por tarefa.
+    - frames_per_segment: Número de frames de cada segmento com afinidade de worker.
+    """
+    if source != 'opencv' or gray or fps:
+        raise ValueError("O backend dask só lê pela fonte opencv (sem --gray/--fps)")
+    if options.get('archive'):
+        raise ValueError("O backend dask não monta o mosaico inteiro, então não grava tiles (--archive)")
+
+    own_client = client is None
+    if own_client:
+        client = Client(scheduler) if scheduler else Client()
+
+    try:
+        total_frames = count_frames(video_path)
+
+        # Segmento -> worker, em rodízio, com prefetch do trecho no worker escolhido
+        workers = sorted(client.scheduler_info()['workers'])
+        segment_workers = {}
+        # Manter as referências: o Dask cancela tarefas cujos futures são descartados
+        prefetches = []
+        for segment, seg_start in enumerate(range(0, total_frames, frames_per_segment)):
+            worker = workers[segment % len(workers)]
+            segment_workers[segment] = [worker]
+            prefetches.append(client.submit(prefetch_video, video_path, seg_start,
+                                            min(seg_start + frames_per_segment, total_frames), total_frames,
+                                            workers=[worker], allow_other_workers=False, priority=1, pure=False))
+
+        frames_per_block = int(imageCount)
+        block_futures = {}
+        p = 0
+        for block_start in range(0, total_frames, frames_per_block):
+            block_end = min(block_start + frames_per_block, total_frames)
+            partials = [
+                client.submit(
+                    mosaic_partial,
+                    start_frame,
+                    min(start_frame + frames_per_task, block_end),
+                    block_start,
+                    block_end - block_start,
+                    video_path,
+                    W_res,
+                    H_res,
+                    NUM_COLUMNS,
+                    escolha,
+                    workers=segment_workers[start_frame // frames_per_segment],
+                    allow_other_workers=True,
+                    pure=False
+                )
+                for start_frame in range(block_start, block_end, frames_per_task)
+            ]
+            future = client.submit(hash_partial, tree_reduce(client, partials), escolha)
+            block_futures[future] = p
+            p += 1
+
+        # Coletar os hashes conforme cada bloco termina
+        results = [None] * p
+        for future in as_completed(block_futures):
+            index = block_futures[future]
+            results[index] = future.result()
+            if results[index] and on_block:
+                on_block(index, *results[index])
+
+        client.cancel(prefetches)
+    finally:
+        if own_client:
+            client.close()
+
+    hashes = [{"HashPointer": r[0], "Hash": r[1]} for r in results if r is not None]
+    return hashes, total_frames
@@ -0,0 +1,54 @@
+"""
+Backend com processos: cada processo abre o vídeo, faz seek até o seu bloco e
+calcula o hash, então nenhum frame precisa ser copiado entre processos.
+"""
+import concurrent.futures
+
+from ..config import NUM_COLUMNS, default_workers
+from ..mosaic import count_frames, create_image_and_hash
+from ..sources import read_blocks, video_fps
+from ..tiles import archive_block
+
+def hash_range(video_path, start_frame, end_frame, W_res, H_res, num_columns, escolha, source='opencv',
+               gray=False, fps=None, decode_threads=None, archive=None, p=0, tile_format='png'):
+    """
+    Lê os frames [start_frame, end_frame) do vídeo e retorna (HashPointer, Hash), ou None.
+    Com archive, grava também os tiles do bloco p.
+    """
+    count = end_frame - start_frame
+    for frames in read_blocks(video_path, W_res, H_res, count, source, gray, fps, start_frame, end_frame,
+                              decode_threads):
+        result = create_image_and_hash(frames, num_columns, escolha)
+        if archive:
+            archive_block(archive, p, frames, num_columns, tile_format)
+        return result
+    return None
+
+def encode_frames(video_path, W_res, H_res, imageCount, escolha, on_block=None, workers=None, source='opencv',
+                  gray=False, fps=None, decode_threads=None, archive=None, tile_format='png', **options):
+    total_frames = count_frames(video_path)
+    if total_frames <= 0:
+        # Sem o número de frames não há como dividir os blocos entre os processos
+        raise RuntimeError(f"O vídeo não informa o número de frames: {video_path} (use o backend thread)")
+    if fps:
+        # Frames na taxa de saída do filtro fps
+        total_frames = int(total_frames * fps / video_fps(video_path))
+    frames_per_block = int(imageCount)
+    starts = list(range(0, total_frames, frames_per_block))
+    results = [None] * len(starts)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or default_workers()) as executor:
+        futures = {
+            executor.submit(hash_range, video_path, start, min(start + frames_per_block, total_frames),
+                            W_res, H_res, NUM_COLUMNS, escolha, source, gray, fps, decode_threads, archive, p,
+                            tile_format): p
+            for p, start in enumerate(starts)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            p = futures[future]
+            results[p] = future.result()
+            if results[p] and on_block:
+                on_block(p, *results[p])
+
+    hashes = [{"HashPointer": r[0], "Hash": r[1]} for r in results if r is not None]
+    return hashes, total_frames
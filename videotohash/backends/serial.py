@@ -0,0 +1,20 @@
+"""Backend serial: lê e calcula os hashes de cada bloco na thread principal."""
+from ..config import NUM_COLUMNS
+from ..mosaic import create_image_and_hash
+from ..sources import read_blocks
+from ..tiles import archive_block
+
+def encode_frames(video_path, W_res, H_res, imageCount, escolha, on_block=None, source='opencv', gray=False,
+                  fps=None, decode_threads=None, archive=None, tile_format='png', **options):
+    hashes = []
+    total_frames = 0
+    for p, frames in enumerate(read_blocks(video_path, W_res, H_res, imageCount, source, gray, fps,
+                                                      threads=decode_threads)):
+        total_frames += len(frames)
+        hash_pointer, img_hash = create_image_and_hash(frames, NUM_COLUMNS, escolha)
+        hashes.append({"HashPointer": hash_pointer, "Hash": img_hash})
+        if archive:
+            archive_block(archive, p, frames, NUM_COLUMNS, tile_format)
+        if on_block:
+            on_block(p, hash_pointer, img_hash)
+    return hashes, total_frames
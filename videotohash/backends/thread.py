@@ -0,0 +1,64 @@
+"""
+Backend com threads: uma thread decodifica e os blocos são hasheados em um
+ThreadPoolExecutor (cv2 e numpy liberam o GIL nas partes pesadas).
+"""
+import concurrent.futures
+from collections import deque
+
+from ..config import NUM_COLUMNS, default_workers
+from ..mosaic import create_image_and_hash
+from ..sources import read_blocks
+from ..tiles import archive_block
+
+def hash_block(frames, p, escolha, archive=None, tile_format='png'):
+    """Hash de um bloco; com archive, grava também os tiles do mosaico."""
+    result = create_image_and_hash(frames, NUM_COLUMNS, escolha)
+    if archive:
+        archive_block(archive, p, frames, NUM_COLUMNS, tile_format)
+    return result
+
+def encode_blocks(blocks, escolha, on_block=None, workers=None, max_in_flight=None, archive=None,
+                  tile_format='png'):
+    """
+    Calcula os hashes de um iterável de blocos de frames conforme eles chegam.
+
+    Não precisa do total de frames: cada bloco é enviado ao pool assim que chega e
+    on_block(p, hash_pointer, img_hash) é chamado em ordem. No máximo max_in_flight
+    blocos ficam em memória ao mesmo tempo, então o consumo é limitado. Com archive, os
+    tiles de cada bloco são gravados em archive (videotohash.tiles).
+
+    Retorna:
+    - (hashes, total de frames lidos)
+    """
+    workers = workers or default_workers()
+    max_in_flight = max_in_flight or workers
+    in_flight = deque()
+    hashes = []
+    total_frames = 0
+
+    def emit_ready(block):
+        # Emitir em ordem os blocos prontos; se o limite foi atingido, esperar o mais antigo
+        while in_flight and (block or in_flight[0][1].done()):
+            q, future = in_flight.popleft()
+            hash_pointer, img_hash = future.result()
+            hashes.append({"HashPointer": hash_pointer, "Hash": img_hash})
+            if on_block:
+                on_block(q, hash_pointer, img_hash)
+            block = False
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for p, frame_buffer in enumerate(blocks):
+            total_frames += len(frame_buffer)
+            emit_ready(len(in_flight) >= max_in_flight)
+            in_flight.append((p, executor.submit(hash_block, frame_buffer, p, escolha, archive, tile_format)))
+            emit_ready(False)
+        while in_flight:
+            emit_ready(True)
+
+    return hashes, total_frames
+
+def encode_frames(video_path, W_res, H_res, imageCount, escolha, on_block=None, workers=None, source='opencv',
+                  gray=False, fps=None, max_in_flight=None, decode_threads=None, archive=None, tile_format='png',
+                  **options):
+    blocks = read_blocks(video_path, W_res, H_res, imageCount, source, gray, fps, threads=decode_threads)
+    return encode_blocks(blocks, escolha, on_block, workers, max_in_flight, archive, tile_format)
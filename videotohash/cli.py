@@ -0,0 +1,294 @@
+"""
+Linha de comando do VideoToHash.
+
+    python -m videotohash hash video.mp4 --backend thread --out playback
+    python -m videotohash stream - --out playback
+    python -m videotohash verify suspeito.mp4 Hashes/Original.json
+    python -m videotohash tiles playback/mosaics/frames_mosaic_0.zip --frame 10 --out frame.png
+    python -m videotohash dedup catalogo/ --out relatorio
+    python -m videotohash serve --port 8765
+
+Só a biblioteca padrão é importada aqui; cv2, numpy, imagehash, psutil e dask
+são importados dentro de cada comando/backend, quando realmente usados. Para medir:
+
+    python -X importtime -m videotohash hash --help
+"""
+import argparse
+import os
+import sys
+import time
+
+from .config import MAX_PIXELS, W_RES, H_RES, NUM_COLUMNS, HASH_METHODS, frames_per_image
+from .backends import BACKENDS
+
+# Mesmo conteúdo de videotohash.sources.SOURCES, sem importar cv2/numpy na partida
+SOURCES = ('opencv', 'ffmpeg', 'pyav')
+
+def print_setup(max_pixels, W_res, H_res, imageCount, in_video_path, out_video_path, backend=None):
+    print("\033[92mSetup\033[0m")
+    print("\033[92mMax Pixels:\033[0m \033[91m", max_pixels, "\033[0m")
+    print("\033[92mResolution Size:\033[0m \033[91m", W_res, "x", H_res, "\033[0m")
+    print("\033[92mFrames per Image:\033[0m \033[91m", imageCount, "\033[0m")
+    print("\033[92m", W_res, "x", H_res, "x", imageCount, "=\033[0m", "\033[91m", W_res * H_res * imageCount, "\033[0m")
+    print("\033[92mIn Video Path:\033[0m \033[91m", in_video_path, "\033[0m")
+    print("\033[92mOut Video Path:\033[0m \033[91m", out_video_path, "\033[0m")
+    if backend:
+        print("\033[92mBackend:\033[0m \033[91m", backend, "\033[0m")
+
+def add_video_arguments(parser):
+    parser.add_argument('--out', default='playback', help='pasta de saída do resultado.json')
+    parser.add_argument('--width', type=int, default=W_RES, help='largura de cada frame no mosaico')
+    parser.add_argument('--height', type=int, default=H_RES, help='altura de cada frame no mosaico')
+    parser.add_argument('--max-pixels', type=int, default=MAX_PIXELS, help='pixels máximos por mosaico')
+    parser.add_argument('--hash', choices=HASH_METHODS, default='phash', help='método de hash do mosaico')
+    parser.add_argument('--workers', type=int, default=None, help='workers (padrão: núcleos físicos)')
+    parser.add_argument('--gray', action='store_true', help='mosaico em tons de cinza (decodifica só a luma)')
+    parser.add_argument('--fps', type=float, default=None, help='reamostra o vídeo para esse fps (fonte ffmpeg)')
+
+def cmd_hash(args):
+    from .backends import get_backend
+    from .result import build_result, hash_method, write_result
+
+    imageCount = frames_per_image(args.width, args.height, args.max_pixels)
+    print_setup(args.max_pixels, args.width, args.height, imageCount, args.video, args.out, args.backend)
+
+    def on_block(p, hash_pointer, img_hash):
+        print(f"\033[92mBloco {p}:\033[0m \033[91m{hash_pointer} {img_hash}\033[0m")
+
+    tuning = {}
+    if args.auto or args.dry_run:
+        from .planner import make_plan, print_plan
+        plan = make_plan(args.video, args.width, args.height, imageCount, HASH_METHODS[args.hash], args.backend,
+                         args.source, args.gray)
+        print_plan(plan)
+        if args.dry_run:
+            return
+        tuning = {"workers": plan["Workers"], "max_in_flight": plan["Max In Flight"],
+                  "decode_threads": plan["Decode Threads"]}
+    if args.workers:
+        tuning["workers"] = args.workers
+
+    backend = get_backend(args.backend)
+    start = time.time()
+    hashes, total_frames = backend.encode_frames(
+        args.video, args.width, args.height, imageCount, HASH_METHODS[args.hash], on_block,
+        scheduler=args.scheduler,
+        frames_per_task=args.frames_per_task, frames_per_segment=args.frames_per_segment,
+        source=args.source, gray=args.gray, fps=args.fps, archive=args.archive, tile_format=args.tile_format,
+        **tuning)
+    end = time.time()
+
+    resultado = build_result(args.width, args.height, imageCount, total_frames, hashes,
+                             hash_method(HASH_METHODS[args.hash], args.backend), args.gray, args.source)
+    path = write_result(args.out, resultado)
+    print("\033[92mTotal Video Frames:\033[0m \033[91m", total_frames, "\033[0m")
+    print("\033[92mTotal Blocks:\033[0m \033[91m", len(hashes), "\033[0m")
+    print("\033[92mElapsed Time:\033[0m \033[91m", end - start, "\033[0m")
+    print(f"Resultado salvo em {path}")
+
+def cmd_verify(args):
+    from .result import write_result
+    from .verify import verify
+
+    def on_block(comparison):
+        status = "igual" if comparison["Match"] else "diferente"
+        print(f"\033[92mBloco {comparison['Index']}:\033[0m \033[91m{comparison['Hash1']} {comparison['Hash2']}",
+              f"{comparison['NormalizedHammingDistance']:.3f} ({status})\033[0m")
+
+    start = time.time()
+    escolha = HASH_METHODS[args.hash] if args.hash else None
+    report = verify(args.video, args.reference, escolha, args.order, args.confidence,
+                    args.block_threshold, args.source, args.gray, args.workers, on_block=on_block)
+    end = time.time()
+
+    path = write_result(args.out, report, name='verificacao.json')
+    print("\033[92mDecision:\033[0m \033[91m", report["Decision"], "\033[0m")
+    print("\033[92mBlocks Checked:\033[0m \033[91m", report["Blocks Checked"], "/", report["Total Blocks"], "\033[0m")
+    print("\033[92mElapsed Time:\033[0m \033[91m", end - start, "\033[0m")
+    print(f"Verificação salva em {path}")
+    # Código de saída 1 quando o vídeo não bate com a referência, para uso em scripts
+    return 0 if report["Decision"] == 'match' else 1
+
+def cmd_tiles(args):
+    import cv2
+    from .tiles import TileArchive
+
+    with TileArchive(args.archive) as tiles:
+        # O número de frames só é conhecido depois de abrir o arquivo, então não dá para
+        # checar em check_arguments; sai com o mesmo código de erro de uso do argparse
+        if args.frame is not None and not 0 <= args.frame < len(tiles):
+            print(f"videotohash tiles: error: --frame {args.frame} fora do bloco "
+                  f"(frames 0 a {len(tiles) - 1})", file=sys.stderr)
+            return 2
+        index = tiles.index
+        print("\033[92mFrames:\033[0m \033[91m", index["Frames"], "\033[0m")
+        print("\033[92mResolution Size:\033[0m \033[91m", index["Resolution Size"], "\033[0m")
+        print("\033[92mTile Format:\033[0m \033[91m", index["Tile Format"], "\033[0m")
+        if args.hash:
+            hash_pointer, img_hash = tiles.hash(HASH_METHODS[args.hash])
+            print("\033[92mHashPointer:\033[0m \033[91m", hash_pointer, "\033[0m")
+            print("\033[92mHash:\033[0m \033[91m", img_hash, "\033[0m")
+        if args.out:
+            image = tiles.frame(args.frame) if args.frame is not None else tiles.mosaic()
+            if not cv2.imwrite(args.out, image):
+                raise RuntimeError(f"Erro ao salvar {args.out}")
+            print(f"Imagem salva em {args.out}")
+
+def cmd_dedup(args):
+    from .dedup import find_duplicates
+    from .result import write_result
+
+    start = time.time()
+    report = find_duplicates(args.paths, args.tables, args.block_threshold, args.min_score, args.max_bucket,
+                             args.workers, args.recall)
+    end = time.time()
+
+    path = write_result(args.out, report, name='duplicados.json')
+    print("\033[92mFiles:\033[0m \033[91m", report["Files"], "\033[0m")
+    print("\033[92mBlocks:\033[0m \033[91m", report["Blocks"], "\033[0m")
+    print("\033[92mTables:\033[0m \033[91m", report["Tables"], "x", report["Key Bits"], "bits\033[0m")
+    print("\033[92mCandidate Video Pairs:\033[0m \033[91m", report["Candidate Video Pairs"], "\033[0m")
+    print("\033[92mDuplicate Pairs:\033[0m \033[91m", len(report["Pairs"]), "\033[0m")
+    print("\033[92mClusters:\033[0m \033[91m", len(report["Clusters"]), "\033[0m")
+    print("\033[92mElapsed Time:\033[0m \033[91m", end - start, "\033[0m")
+    print(f"Duplicados salvos em {path}")
+
+def cmd_stream(args):
+    from .stream import main as stream_main
+    stream_main(args.source, args.out, args.width, args.height, args.max_pixels, HASH_METHODS[args.hash], args.workers,
+                args.gray, args.fps)
+
+def cmd_serve(args):
+    from . import service
+    service.main(args.host, args.port, args.workers or service.MAX_WORKERS, args.max_jobs,
+                 args.memory_budget or service.MEMORY_BUDGET)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='videotohash', description='Mosaicos de frames de vídeo e seus hashes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('hash', help='gera o resultado.json de um vídeo')
+    p.add_argument('video', help='caminho do vídeo de entrada')
+    p.add_argument('--backend', choices=BACKENDS, default='thread', help='como paralelizar (padrão: thread)')
+    p.add_argument('--source', choices=SOURCES, default='opencv',
+                   help='decodificação: opencv, ffmpeg (escala dentro do decoder) ou pyav (threads do codec)')
+    add_video_arguments(p)
+    p.add_argument('--scheduler', default=None, help='endereço do scheduler Dask (backend dask)')
+    p.add_argument('--frames-per-task', type=int, default=64, help='frames por tarefa (backend dask)')
+    p.add_argument('--frames-per-segment', type=int, default=256, help='frames por segmento com afinidade (backend dask)')
+    p.add_argument('--auto', action='store_true',
+                   help='escolhe workers, blocos em voo e threads de decodificação pela memória e núcleos')
+    p.add_argument('--dry-run', action='store_true', help='só mostra o plano (pico de memória e tempo previstos)')
+    p.add_argument('--archive', default=None, help='pasta onde gravar os mosaicos em tiles (frames_mosaic_{p}.zip)')
+    p.add_argument('--tile-format', choices=('png', 'jpg'), default='png',
+                   help='png (sem perdas, reproduz o hash) ou jpg (mais rápido, com perdas)')
+    p.set_defaults(func=cmd_hash)
+
+    p = commands.add_parser('stream', help='hash de stdin, arquivo em gravação ou diretório de segmentos')
+    p.add_argument('source', nargs='?', default='-', help="'-' (stdin), arquivo crescendo ou diretório")
+    add_video_arguments(p)
+    p.set_defaults(func=cmd_stream)
+
+    p = commands.add_parser('verify', help='compara um vídeo com um resultado.json de referência, parando cedo')
+    p.add_argument('video', help='caminho do vídeo suspeito')
+    p.add_argument('reference', help='resultado.json de referência (resolução e frames por imagem vêm dele)')
+    p.add_argument('--out', default='playback', help='pasta de saída do verificacao.json')
+    p.add_argument('--hash', choices=HASH_METHODS, default=None,
+                   help='método de hash (padrão: o "Hash Method" da referência); precisa ser o da referência')
+    p.add_argument('--order', choices=('spread', 'sequential'), default='spread',
+                   help='ordem dos blocos: espalhados pela linha do tempo ou do início ao fim')
+    p.add_argument('--confidence', type=float, default=0.99, help='confiança para parar a decodificação')
+    p.add_argument('--block-threshold', type=float, default=0.25,
+                   help='distância de Hamming normalizada máxima para um bloco contar como igual')
+    p.add_argument('--source', choices=SOURCES, default=None,
+                   help='decodificação: opencv, ffmpeg ou pyav (padrão: o "Source" da referência)')
+    p.add_argument('--gray', action='store_true', default=None,
+                   help='mosaico em tons de cinza (padrão: o "Color Mode" da referência)')
+    p.add_argument('--workers', type=int, default=None, help='blocos verificados ao mesmo tempo')
+    p.set_defaults(func=cmd_verify)
+
+    p = commands.add_parser('tiles', help='inspeciona um mosaico gravado em tiles')
+    p.add_argument('archive', help='arquivo frames_mosaic_{p}.zip')
+    p.add_argument('--frame', type=int, default=None, help='exporta só esse frame (acesso direto ao tile)')
+    p.add_argument('--out', default=None, help='imagem de saída (o frame, ou o mosaico remontado)')
+    p.add_argument('--hash', choices=HASH_METHODS, default=None, help='recalcula HashPointer/Hash a partir dos tiles')
+    p.set_defaults(func=cmd_tiles)
+
+    p = commands.add_parser('dedup', help='encontra vídeos quase duplicados em todo o catálogo de resultado.json')
+    p.add_argument('paths', nargs='+', help='resultado.json e/ou diretórios com eles (busca recursiva)')
+    p.add_argument('--out', default='playback', help='pasta de saída do duplicados.json')
+    p.add_argument('--tables', type=int, default=None,
+                   help='tabelas do LSH por coluna de hash (padrão: pelo tamanho do catálogo e por --recall)')
+    p.add_argument('--recall', type=float, default=0.5,
+                   help='probabilidade, por bloco, de achar um par a exatamente --block-threshold')
+    p.add_argument('--block-threshold', type=float, default=0.25,
+                   help='distância de Hamming normalizada máxima entre os Hashes de dois blocos')
+    p.add_argument('--min-score', type=float, default=0.5,
+                   help='fração mínima dos blocos do vídeo menor com par no outro vídeo')
+    p.add_argument('--max-bucket', type=int, default=1000, help='baldes do LSH maiores que isso são ignorados')
+    p.add_argument('--workers', type=int, default=None, help='processos (padrão: núcleos físicos)')
+    p.set_defaults(func=cmd_dedup)
+
+    p = commands.add_parser('serve', help='serviço residente com workers aquecidos')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--workers', type=int, default=None, help='workers de hash (padrão: núcleos físicos)')
+    p.add_argument('--max-jobs', type=int, default=2, help='vídeos decodificados ao mesmo tempo')
+    p.add_argument('--memory-budget', type=int, default=None, help='bytes de blocos em voo (frames e mosaico) somando todos os jobs')
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+def check_mosaic_size(parser, args):
+    """
+    build_mosaic corta a faixa horizontal em NUM_COLUMNS partes iguais; como o último
+    bloco pode ter menos frames, só uma largura múltipla de NUM_COLUMNS serve para
+    todos os blocos.
+    """
+    if args.width < 1 or args.height < 1:
+        parser.error("--width e --height precisam ser pelo menos 1")
+    if args.width % NUM_COLUMNS:
+        parser.error(f"--width precisa ser múltiplo de {NUM_COLUMNS} (número de faixas do mosaico)")
+    if frames_per_image(args.width, args.height, args.max_pixels) < 1:
+        parser.error(f"--max-pixels {args.max_pixels} não comporta nem um frame de "
+                     f"{args.width}x{args.height}")
+
+def check_arguments(parser, args):
+    """
+    Combinações de opções que os backends e fontes recusariam só depois de começar;
+    aqui saem como erro de uso do argparse.
+    """
+    if args.command in ('hash', 'stream'):
+        check_mosaic_size(parser, args)
+    if args.command == 'hash':
+        if args.fps and args.source != 'ffmpeg':
+            parser.error("--fps só está disponível com --source ffmpeg")
+        if args.backend == 'dask':
+            if args.source != 'opencv':
+                parser.error("o backend dask só lê pela fonte opencv")
+            if args.gray or args.fps:
+                parser.error("o backend dask não aceita --gray nem --fps")
+            if args.archive:
+                parser.error("o backend dask não monta o mosaico inteiro, então não aceita --archive")
+            if args.auto or args.dry_run:
+                parser.error("--auto/--dry-run planejam esta máquina; o backend dask usa os recursos do cluster")
+    elif args.command == 'verify':
+        if not 0.5 < args.confidence < 1:
+            parser.error("--confidence precisa estar entre 0.5 e 1 (exclusivo)")
+    elif args.command == 'dedup':
+        if not 0 < args.recall < 1:
+            parser.error("--recall precisa estar entre 0 e 1 (exclusivo)")
+        if args.tables is not None and args.tables < 1:
+            parser.error("--tables precisa ser pelo menos 1")
+    elif args.command == 'stream':
+        if args.fps and os.path.isdir(args.source):
+            parser.error("--fps não se aplica a diretórios de segmentos")
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_arguments(parser, args)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
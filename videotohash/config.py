@@ -0,0 +1,31 @@
+"""Valores padrão compartilhados pelo CLI e pelos backends (sem imports pesados)."""
+import os
+
+# Max Pixels / Can't exceed 168956970 pixels
+MAX_PIXELS = 168956970
+W_RES = 640
+H_RES = 360
+NUM_COLUMNS = 20
+
+# Métodos de hash, na numeração "escolha" usada pelos scripts
+HASH_METHODS = {'phash': '1', 'ahash': '2', 'dhash': '3'}
+
+# Distância de Hamming normalizada máxima para o Hash de um bloco contar como igual
+# (verify e dedup). Entre Original.json e Pirata.json a maioria dos blocos fica em
+# 0,03-0,16; hashes sem relação ficam perto de 0,5.
+BLOCK_THRESHOLD = 0.25
+
+# Memória extra usada por create_image_and_hash, em múltiplos do tamanho dos frames do
+# bloco (mosaico horizontal e vertical, JPEG e imagem PIL). Medido em RSS de pico:
+# ~2,2x em BGR e ~3,0x em tons de cinza; os valores abaixo têm uma margem.
+MOSAIC_MEMORY_FACTOR = 2.5
+MOSAIC_MEMORY_FACTOR_GRAY = 3.5
+
+def frames_per_image(W_res, H_res, max_pixels=MAX_PIXELS):
+    """Quantos frames W_res x H_res cabem em um mosaico de max_pixels."""
+    return int(max_pixels / (W_res * H_res))
+
+def default_workers():
+    """Número de núcleos físicos (psutil só é importado quando necessário)."""
+    import psutil
+    return psutil.cpu_count(logical=False) or os.cpu_count() or 1
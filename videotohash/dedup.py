@@ -0,0 +1,356 @@
+"""
+Auto-junção do catálogo: encontra todos os pares de vídeos quase duplicados entre
+muitos resultado.json.
+
+1. Todos os blocos são carregados em arrays (hash de 64 bits em uint64, vídeo, bloco),
+   separados em grupos de mesma resolução, frames por imagem, "Hash Method", "Color
+   Mode" e "Source" (blocos de grupos diferentes não são comparáveis).
+2. LSH por amostragem de bits: cada tabela sorteia ~log2(N) dos 64 bits e usa esses
+   bits do Hash (ou do HashPointer) como chave; blocos de vídeos diferentes com a
+   mesma chave em alguma tabela viram pares candidatos. O número de tabelas sai do
+   recall desejado para pares a block_threshold (auto_tables), e o tamanho dos
+   baldes é controlado por max_bucket. Cada partição (coluna de hash, tabela) roda
+   em um processo.
+3. Pares de blocos candidatos com Hash próximo (Hamming vetorizado) indicam pares de
+   vídeos; cada par de vídeos é então verificado por inteiro, todos os blocos de um
+   contra todos os do outro, também vetorizado e em processos.
+4. Pares com score suficiente viram clusters (componentes conexas).
+
+Nenhum laço Python passa por pares de blocos; o custo é proporcional ao número de
+candidatos, não a N².
+"""
+import os
+import glob
+import json
+import concurrent.futures
+from math import comb
+import numpy as np
+
+from .config import BLOCK_THRESHOLD, default_workers
+from .result import result_color_mode, result_hash_method, result_source
+
+# Probabilidade mínima, por bloco, de um par a exatamente threshold_bits bits de
+# distância virar candidato. Um par de vídeos duplicados tem vários blocos próximos
+# (e o HashPointer também gera candidatos), então o recall por vídeo é bem maior.
+TARGET_RECALL = 0.5
+# Bits mínimos de cada chave do LSH
+MIN_KEY_BITS = 16
+# Semente do sorteio dos bits de cada tabela (resultados reprodutíveis)
+LSH_SEED = 0
+# Chaves de pares de vídeos acumuladas antes de cada np.unique parcial
+UNIQUE_BATCH = 10_000_000
+# Comparações de blocos por tarefa na verificação dos pares de vídeos
+VERIFY_CHUNK = 4_000_000
+# Fração mínima de blocos do vídeo menor com par confirmado no outro vídeo
+MIN_SCORE = 0.5
+# Baldes maiores que isso (ex. frames pretos, vinhetas comuns) não geram candidatos
+MAX_BUCKET = 1000
+HASH_BITS = 64
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: soma da contagem de bits de cada byte
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+def hamming_bits(a, b):
+    """Distância de Hamming elemento a elemento entre dois arrays uint64."""
+    return _popcount(np.bitwise_xor(a, b))
+
+def find_results(paths):
+    """Arquivos .json listados diretamente ou encontrados (recursivamente) nos diretórios."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '**', '*.json'), recursive=True))
+        else:
+            files.append(path)
+    return files
+
+def _load_file(path):
+    """(chave do grupo, HashPointers, Hashes) de um resultado.json, ou None se não for um."""
+    try:
+        with open(path) as json_file:
+            resultado = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(resultado, dict) or not resultado.get("Hashes"):
+        # Ex. arquivos de comparação como Hashes/OxP.json
+        return None
+    # Hashes de métodos, modos de cor ou fontes diferentes nunca são comparados entre si
+    group = ' / '.join(str(value) for value in (
+        resultado.get("Resolution Size"), resultado.get("Frames per Image"), result_hash_method(resultado),
+        result_color_mode(resultado), result_source(resultado)))
+    pointers = np.array([int(h["HashPointer"], 16) for h in resultado["Hashes"]], dtype=np.uint64)
+    hashes = np.array([int(h["Hash"], 16) for h in resultado["Hashes"]], dtype=np.uint64)
+    return group, pointers, hashes
+
+def load_catalogue(paths, workers=None):
+    """
+    Carrega os blocos de todos os resultado.json em arrays.
+
+    Retorna:
+    - dict com Files (caminhos dos vídeos aceitos), Blocks per File e os arrays por
+      bloco: Pointer e Hash (uint64), Video e Block (índices) e Group (grupo do vídeo).
+    """
+    files = find_results(paths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or default_workers()) as executor:
+        loaded = list(executor.map(_load_file, files, chunksize=64))
+
+    accepted, pointers, hashes, videos, blocks, groups = [], [], [], [], [], []
+    group_ids = {}
+    for path, item in zip(files, loaded):
+        if item is None:
+            continue
+        group, file_pointers, file_hashes = item
+        v = len(accepted)
+        accepted.append(path)
+        pointers.append(file_pointers)
+        hashes.append(file_hashes)
+        videos.append(np.full(len(file_hashes), v, dtype=np.int32))
+        blocks.append(np.arange(len(file_hashes), dtype=np.int32))
+        groups.append(np.full(len(file_hashes), group_ids.setdefault(group, len(group_ids)), dtype=np.int32))
+
+    def join(arrays, dtype):
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+    return {
+        "Files": accepted,
+        "Blocks per File": np.array([len(h) for h in hashes], dtype=np.int64),
+        "Pointer": join(pointers, np.uint64),
+        "Hash": join(hashes, np.uint64),
+        "Video": join(videos, np.int32),
+        "Block": join(blocks, np.int32),
+        "Group": join(groups, np.int32),
+    }
+
+def key_bits(n_blocks):
+    """
+    Bits de cada chave do LSH: log2(n_blocks) (mínimo MIN_KEY_BITS), para que cada
+    balde tenha em média poucos blocos e os candidatos cresçam ~linearmente com o catálogo.
+    """
+    return max(MIN_KEY_BITS, int(np.ceil(np.log2(max(n_blocks, 2)))))
+
+def collision_probability(distance, bits):
+    """Probabilidade de dois hashes a distance bits de distância terem a mesma chave de bits bits sorteados."""
+    return comb(HASH_BITS - distance, bits) / comb(HASH_BITS, bits)
+
+def auto_tables(n_blocks, threshold_bits, recall=TARGET_RECALL):
+    """
+    Tabelas necessárias para que um par de blocos a threshold_bits bits de distância
+    caia no mesmo balde em pelo menos uma tabela com probabilidade recall. Pares mais
+    próximos são encontrados com probabilidade maior.
+    """
+    p = collision_probability(threshold_bits, key_bits(n_blocks))
+    if p >= 1:
+        return 1
+    if p <= 0:
+        raise ValueError(f"Chaves de {key_bits(n_blocks)} bits não encontram pares a {threshold_bits} bits")
+    return max(1, int(np.ceil(np.log(1 - recall) / np.log(1 - p))))
+
+def table_positions(tables, bits, seed=LSH_SEED):
+    """Posições dos bits sorteados (sem repetição) para cada tabela; a semente fixa deixa o resultado reprodutível."""
+    rng = np.random.default_rng(seed)
+    return [np.sort(rng.choice(HASH_BITS, bits, replace=False)) for _ in range(tables)]
+
+def sample_key(values, positions):
+    """
+    Chave de cada hash: os bits nas posições dadas, concatenados (bit i da chave = bit
+    positions[i] do hash). Feito com uma tabela de 256 entradas por byte do hash.
+    """
+    data = values.astype('<u8', copy=False).view(np.uint8).reshape(-1, 8)
+    byte_values = np.arange(256, dtype=np.uint64)
+    keys = np.zeros(len(values), dtype=np.uint64)
+    for byte in range(8):
+        lookup = np.zeros(256, dtype=np.uint64)
+        for i, position in enumerate(positions):
+            if position // 8 == byte:
+                lookup |= ((byte_values >> np.uint64(position % 8)) & np.uint64(1)) << np.uint64(i)
+        if lookup.any():
+            keys |= lookup[data[:, byte]]
+    return keys
+
+def bucket_candidates(keys, max_bucket=MAX_BUCKET):
+    """
+    Pares (i, j) de blocos com a mesma chave.
+
+    Os blocos são ordenados pela chave; os pares saem comparando cada bloco com o
+    k-ésimo seguinte enquanto os dois estão no mesmo balde, então o trabalho é
+    proporcional ao número de pares gerados.
+    """
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    boundary = np.ones(len(order), dtype=bool)
+    boundary[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    run = np.cumsum(boundary)
+    # Baldes grandes demais não trazem informação e explodiriam o número de pares
+    sizes = np.bincount(run)
+    keep = sizes[run] <= max_bucket
+    order, run = order[keep], run[keep]
+
+    firsts, seconds = [], []
+    k = 1
+    active = np.nonzero(run[1:] == run[:-1])[0]
+    while active.size:
+        firsts.append(order[active])
+        seconds.append(order[active + k])
+        k += 1
+        active = active[active + k < len(order)]
+        active = active[run[active + k] == run[active]]
+    if not firsts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+# Arrays do catálogo em cada processo do pool (enviados uma vez pelo initializer)
+_catalogue = None
+
+def _init_worker(catalogue):
+    global _catalogue
+    _catalogue = catalogue
+
+def join_partition(column, positions, threshold_bits=16, max_bucket=MAX_BUCKET):
+    """
+    Uma partição da junção: candidatos de uma tabela (bits positions) da coluna
+    ('Hash' ou 'Pointer'). O grupo vai nos bits altos da chave, então blocos de grupos
+    diferentes nunca caem no mesmo balde.
+
+    Só os pares de blocos cujo Hash fica a até threshold_bits bits viram pares de
+    vídeos candidatos, o que descarta as colisões ao acaso nos baldes.
+
+    Retorna:
+    - (chaves video_a * n_videos + video_b dos pares de vídeos, com a < b; candidatos gerados)
+    """
+    catalogue = _catalogue
+    keys = sample_key(catalogue[column], positions)
+    keys |= catalogue["Group"].astype(np.uint64) << np.uint64(len(positions))
+    first, second = bucket_candidates(keys, max_bucket)
+    candidates = len(first)
+    video_a, video_b = catalogue["Video"][first], catalogue["Video"][second]
+    keep = (video_a != video_b) & (hamming_bits(catalogue["Hash"][first], catalogue["Hash"][second]) <= threshold_bits)
+    video_a, video_b = video_a[keep].astype(np.int64), video_b[keep].astype(np.int64)
+    keys = np.minimum(video_a, video_b) * len(catalogue["Files"]) + np.maximum(video_a, video_b)
+    return np.unique(keys), candidates
+
+def verify_pairs(pair_keys, threshold_bits=16):
+    """
+    Verificação completa de pares de vídeos: todos os blocos de um contra todos os do
+    outro, em um único produto cartesiano vetorizado.
+
+    Retorna:
+    - (blocos de a com par em b, blocos de b com par em a) para cada par.
+    """
+    catalogue = _catalogue
+    n_files = len(catalogue["Files"])
+    n_blocks = len(catalogue["Hash"])
+    a, b = pair_keys // n_files, pair_keys % n_files
+    na, nb = catalogue["Blocks per File"][a], catalogue["Blocks per File"][b]
+    sizes = na * nb
+    pair = np.repeat(np.arange(len(pair_keys)), sizes)
+    # Posição de cada comparação dentro do produto cartesiano do seu par
+    within = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    block_a = catalogue["Offsets"][a][pair] + within // nb[pair]
+    block_b = catalogue["Offsets"][b][pair] + within % nb[pair]
+    close = hamming_bits(catalogue["Hash"][block_a], catalogue["Hash"][block_b]) <= threshold_bits
+    pair, block_a, block_b = pair[close], block_a[close], block_b[close]
+    matched_a = np.bincount(np.unique(pair * n_blocks + block_a) // n_blocks, minlength=len(pair_keys))
+    matched_b = np.bincount(np.unique(pair * n_blocks + block_b) // n_blocks, minlength=len(pair_keys))
+    return matched_a, matched_b
+
+def _verify_chunks(pair_keys, blocks_per_file, n_files):
+    """Divide os pares em pedaços de ~VERIFY_CHUNK comparações de blocos."""
+    sizes = blocks_per_file[pair_keys // n_files] * blocks_per_file[pair_keys % n_files]
+    bounds = np.searchsorted(np.cumsum(sizes), np.arange(VERIFY_CHUNK, sizes.sum(), VERIFY_CHUNK))
+    return [chunk for chunk in np.split(pair_keys, bounds) if len(chunk)]
+
+def find_duplicates(paths, tables=None, block_threshold=BLOCK_THRESHOLD, min_score=MIN_SCORE,
+                    max_bucket=MAX_BUCKET, workers=None, recall=TARGET_RECALL):
+    """
+    Auto-junção do catálogo.
+
+    Parâmetros:
+    - paths: resultado.json e/ou diretórios com eles.
+    - tables: Tabelas do LSH por coluna de hash; None calcula pelo tamanho do catálogo
+      e por recall (auto_tables). Mais tabelas = mais recall e mais tempo.
+    - block_threshold: Distância de Hamming normalizada máxima entre Hashes de blocos.
+    - min_score: Fração mínima de blocos do vídeo menor com par no outro vídeo.
+    - max_bucket: Baldes maiores que isso são ignorados.
+    - recall: Probabilidade, por bloco, de encontrar um par a exatamente block_threshold.
+
+    Retorna:
+    - dict com as contagens, Pairs (pares de vídeos com Score) e Clusters (listas de
+      caminhos de vídeos duplicados entre si).
+    """
+    workers = workers or default_workers()
+    catalogue = load_catalogue(paths, workers)
+    files = catalogue["Files"]
+    blocks_per_file = catalogue["Blocks per File"]
+    n_blocks = len(catalogue["Hash"])
+    catalogue["Offsets"] = np.cumsum(blocks_per_file) - blocks_per_file
+    threshold_bits = int(block_threshold * HASH_BITS)
+    bits = key_bits(n_blocks)
+    tables = tables or auto_tables(n_blocks, threshold_bits, recall)
+
+    partitions = [(column, positions) for column in ('Hash', 'Pointer') for positions in table_positions(tables, bits)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(catalogue,)) as executor:
+        results = executor.map(join_partition, *zip(*partitions), [threshold_bits] * len(partitions),
+                               [max_bucket] * len(partitions), chunksize=max(1, len(partitions) // (4 * workers)))
+        # O mesmo par de vídeos sai de várias tabelas: as chaves são unificadas aos poucos,
+        # para não guardar as de todas as tabelas ao mesmo tempo
+        candidates = 0
+        pair_keys = np.empty(0, dtype=np.int64)
+        pending, pending_size = [], 0
+        for keys, n in results:
+            candidates += n
+            pending.append(keys)
+            pending_size += len(keys)
+            if pending_size >= max(UNIQUE_BATCH, len(pair_keys)):
+                pair_keys = np.unique(np.concatenate([pair_keys] + pending))
+                pending, pending_size = [], 0
+        pair_keys = np.unique(np.concatenate([pair_keys] + pending))
+
+        chunks = _verify_chunks(pair_keys, blocks_per_file, len(files))
+        verified = list(executor.map(verify_pairs, chunks, [threshold_bits] * len(chunks)))
+
+    pairs = []
+    for chunk, (matched_a, matched_b) in zip(chunks, verified):
+        for key, ma, mb in zip(chunk, matched_a, matched_b):
+            a, b = divmod(int(key), len(files))
+            matched = min(ma, mb)
+            score = matched / min(blocks_per_file[a], blocks_per_file[b])
+            if score >= min_score:
+                pairs.append({"Video1": files[a], "Video2": files[b], "Matched Blocks": int(matched),
+                              "Blocks1": int(blocks_per_file[a]), "Blocks2": int(blocks_per_file[b]),
+                              "Score": float(score)})
+    pairs.sort(key=lambda pair: -pair["Score"])
+
+    return {
+        "Files": len(files),
+        "Blocks": n_blocks,
+        "Tables": tables,
+        "Key Bits": bits,
+        "Block Recall at Threshold": 1 - (1 - collision_probability(threshold_bits, bits)) ** tables,
+        "Candidate Block Pairs": int(candidates),
+        "Candidate Video Pairs": int(len(pair_keys)),
+        "Pairs": pairs,
+        "Clusters": clusters(pairs),
+    }
+
+def clusters(pairs):
+    """Componentes conexas (union-find) dos pares de vídeos duplicados."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for pair in pairs:
+        parent[find(pair["Video1"])] = find(pair["Video2"])
+    groups = {}
+    for video in parent:
+        groups.setdefault(find(video), []).append(video)
+    return sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group))
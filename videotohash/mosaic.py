@@ -0,0 +1,127 @@
+"""
+Núcleo comum aos backends: leitura de frames, montagem do mosaico e hashes.
+
+Os hashes são idênticos aos do VideoToHashMTJson.py: o mosaico é codificado em
+JPEG (aqui em memória, com cv2.imencode) e lido de volta pelo PIL, e o HashPointer
+é o pHash do primeiro frame do bloco.
+"""
+import io
+import warnings
+import cv2
+import numpy as np
+import imagehash
+from PIL import Image
+
+from .config import NUM_COLUMNS
+
+warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+
+# Seeks até frames menores que isso viram leitura sequencial (ver seek_frames)
+MIN_SEEK_FRAMES = 32
+
+def build_mosaic(frames, num_columns=NUM_COLUMNS):
+    """Mosaico horizontal dividido em num_columns faixas empilhadas verticalmente."""
+    mosaic_horizontal = np.concatenate(frames, axis=1)
+    mosaic_vertical = np.array_split(mosaic_horizontal, num_columns, axis=1)
+    return np.concatenate(mosaic_vertical, axis=0)
+
+def hash_image(img, escolha):
+    """Hash de uma imagem PIL conforme a escolha ('1' phash, '2' average, '3' dhash)."""
+    if escolha == '2':
+        return imagehash.average_hash(img)
+    if escolha == '3':
+        return imagehash.dhash(img)
+    return imagehash.phash(img)
+
+def create_image_and_hash(frames, num_columns, escolha):
+    """
+    Monta o mosaico em memória e retorna (HashPointer, Hash) como strings.
+    """
+    success, buffer = cv2.imencode('.jpg', build_mosaic(frames, num_columns))
+    if not success:
+        raise RuntimeError("Erro ao codificar o mosaico")
+
+    hash_pointer = str(imagehash.phash(Image.fromarray(frames[0])))
+    with Image.open(io.BytesIO(buffer.tobytes())) as img:
+        img_hash = str(hash_image(img, escolha))
+
+    return hash_pointer, img_hash
+
+def open_capture(video_path, threads=None):
+    """cv2.VideoCapture do vídeo (threads: CAP_PROP_N_THREADS); RuntimeError se não abrir."""
+    if threads:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, int(threads)])
+    else:
+        cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Erro ao abrir o vídeo: {video_path}")
+    return cap
+
+def seek_frames(video_path, start_frame, threads=None):
+    """
+    Abre o vídeo posicionado em start_frame e retorna (captura, primeiro frame ou None).
+
+    O seek do OpenCV não é exato em todo arquivo (em MPEG-TS com GOP aberto ele cai no
+    keyframe seguinte): a posição informada antes e depois da primeira leitura é
+    conferida, e se o seek caiu fora do alvo o vídeo é reaberto e os frames até
+    start_frame são pulados um a um. Abaixo de MIN_SEEK_FRAMES os frames são sempre
+    pulados, já que um seek até o frame 1 chega a informar a posição certa no frame errado.
+    """
+    cap = open_capture(video_path, threads)
+    if start_frame >= MIN_SEEK_FRAMES:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if cap.get(cv2.CAP_PROP_POS_FRAMES) == start_frame:
+            ret, frame = cap.read()
+            if ret and cap.get(cv2.CAP_PROP_POS_FRAMES) == start_frame + 1:
+                return cap, frame
+        cap.release()
+        cap = open_capture(video_path, threads)
+    for _ in range(start_frame):
+        if not cap.grab():
+            break
+    return cap, None
+
+def read_frames(video_path, W_res, H_res, start_frame=0, end_frame=None, threads=None):
+    """
+    Gerador de frames redimensionados para W_res x H_res.
+
+    Parâmetros:
+    - start_frame: Primeiro frame lido (com seek conferido, se maior que zero; ver seek_frames).
+    - end_frame: Frame final (exclusivo); None lê até o fim do vídeo.
+    - threads: Threads do decoder (CAP_PROP_N_THREADS); None deixa o padrão do OpenCV.
+    """
+    if start_frame:
+        cap, first = seek_frames(video_path, start_frame, threads)
+    else:
+        cap, first = open_capture(video_path, threads), None
+    try:
+        i = start_frame
+        while end_frame is None or i < end_frame:
+            if first is not None:
+                frame, first = first, None
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+            yield cv2.resize(frame, (W_res, H_res))
+            i += 1
+    finally:
+        cap.release()
+
+def iter_blocks(frames, imageCount):
+    """Agrupa um iterável de frames em listas de imageCount (a última pode ser menor)."""
+    imageCount = int(imageCount)
+    frame_buffer = []
+    for frame in frames:
+        frame_buffer.append(frame)
+        if len(frame_buffer) >= imageCount:
+            yield frame_buffer
+            frame_buffer = []
+    if frame_buffer:
+        yield frame_buffer
+
+def count_frames(video_path):
+    cap = open_capture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return total_frames
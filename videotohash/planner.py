@@ -0,0 +1,196 @@
+"""
+Planejamento de recursos: escolhe workers, blocos em voo e threads de decodificação
+a partir do vídeo e da máquina, e estima o pico de memória e o tempo de execução.
+
+O tamanho do bloco (imageCount) não é alterado: ele define os hashes, e mudar o
+bloco deixaria o resultado incomparável com outros resultado.json.
+"""
+import os
+import time
+import cv2
+import psutil
+
+from .config import NUM_COLUMNS, MOSAIC_MEMORY_FACTOR, MOSAIC_MEMORY_FACTOR_GRAY
+from .mosaic import create_image_and_hash
+from .sources import read_blocks
+
+# Backends com plano; o dask depende dos recursos do cluster, não desta máquina
+PLANNED_BACKENDS = ('serial', 'thread', 'process')
+# Memória base de um processo com cv2/numpy/PIL/imagehash importados
+PROCESS_BASE_BYTES = 150 * 1024 * 1024
+# Fração da memória disponível que o plano pode usar
+MEMORY_SAFETY = 0.8
+# Frames usados para medir a velocidade de decodificação e de hash
+CALIBRATION_FRAMES = 48
+
+def probe_video(video_path):
+    """Resolução, fps, número de frames e codec do vídeo."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Erro ao abrir o vídeo: {video_path}")
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    info = {
+        "Width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "Height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "FPS": cap.get(cv2.CAP_PROP_FPS),
+        "Frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "Codec": ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip('\x00'),
+        "Size": os.path.getsize(video_path),
+    }
+    cap.release()
+    return info
+
+def probe_machine():
+    """Memória disponível e núcleos da máquina."""
+    return {
+        "Available Memory": psutil.virtual_memory().available,
+        "Physical Cores": psutil.cpu_count(logical=False) or 1,
+        "Logical Cores": psutil.cpu_count(logical=True) or 1,
+    }
+
+def calibrate(video_path, W_res, H_res, escolha, source='opencv', gray=False, decode_threads=None):
+    """
+    Mede, com até CALIBRATION_FRAMES frames (menos se o vídeo for mais curto), a
+    decodificação (frames/s) e o hash (s por frame).
+
+    O hash é medido em um bloco pequeno; o custo de montar e codificar o mosaico
+    cresce linearmente com o número de frames, então o valor por frame é extrapolável.
+    """
+    start = time.time()
+    frames = next(iter(read_blocks(video_path, W_res, H_res, CALIBRATION_FRAMES, source, gray,
+                                   threads=decode_threads)), None)
+    decode_time = time.time() - start
+    if frames is None or not len(frames):
+        raise RuntimeError(f"Nenhum frame lido de {video_path}")
+
+    start = time.time()
+    create_image_and_hash(frames, NUM_COLUMNS, escolha)
+    hash_time = time.time() - start
+    return {
+        "Decode FPS": len(frames) / decode_time if decode_time > 0 else float('inf'),
+        "Hash Seconds per Frame": hash_time / len(frames),
+    }
+
+def make_plan(video_path, W_res, H_res, imageCount, escolha='1', backend='thread', source='opencv', gray=False,
+              measure=True):
+    """
+    Monta o plano de execução.
+
+    - thread: uma thread decodifica (com decode_threads threads do codec) e os blocos
+      em voo ficam limitados pelo que cabe na memória; workers = min(núcleos, em voo).
+    - process: cada processo decodifica e hasheia o seu bloco, então workers é limitado
+      pela memória por processo e as threads do codec são divididas entre eles.
+    - serial: um bloco por vez.
+
+    Outros backends (dask) não têm plano e levantam ValueError.
+
+    Retorna:
+    - dict com Video, Machine, o plano (Workers, Max In Flight, Decode Threads) e as
+      estimativas (Peak Memory, Runtime), no formato impresso por print_plan.
+    """
+    if backend not in PLANNED_BACKENDS:
+        raise ValueError(f"Não há plano para o backend {backend} (opções: {', '.join(PLANNED_BACKENDS)})")
+    video = probe_video(video_path)
+    machine = probe_machine()
+    imageCount = int(imageCount)
+    channels = 1 if gray else 3
+    # Vídeos curtos têm um único bloco, menor que imageCount
+    block_frames = max(1, min(imageCount, video["Frames"]))
+    block_bytes = block_frames * W_res * H_res * channels
+    factor = MOSAIC_MEMORY_FACTOR_GRAY if gray else MOSAIC_MEMORY_FACTOR
+    # Frames do bloco + memória do mosaico enquanto o hash é calculado
+    block_peak = int(block_bytes * (1 + factor))
+    budget = int(machine["Available Memory"] * MEMORY_SAFETY) - PROCESS_BASE_BYTES
+    cores = machine["Physical Cores"]
+    logical = machine["Logical Cores"]
+    total_blocks = max(1, -(-video["Frames"] // imageCount))
+    warnings = []
+
+    if backend == 'process':
+        # Cada processo guarda só o seu bloco e o seu mosaico
+        per_worker = block_peak + PROCESS_BASE_BYTES
+        fits = budget >= per_worker
+        workers = max(1, min(cores, total_blocks, budget // per_worker))
+        max_in_flight = workers
+        decode_threads = max(1, logical // workers)
+        peak = PROCESS_BASE_BYTES + workers * per_worker
+    elif backend == 'serial':
+        fits = budget >= block_peak
+        workers = 1
+        max_in_flight = 1
+        decode_threads = logical
+        peak = PROCESS_BASE_BYTES + block_peak
+    elif backend == 'thread':
+        # O decoder preenche um bloco enquanto até max_in_flight esperam ou estão nos
+        # workers; só os blocos sendo hasheados (no máximo workers) montam o mosaico
+        fits = budget >= block_peak + block_bytes
+        workers = max(1, min(cores, total_blocks))
+        while workers > 1 and workers * block_peak + block_bytes > budget:
+            workers -= 1
+        spare = (budget - block_bytes - int(workers * block_bytes * factor)) // block_bytes
+        max_in_flight = max(workers, min(2 * cores, total_blocks, spare))
+        decode_threads = max(1, min(8, logical - workers + 1))
+        peak = (PROCESS_BASE_BYTES + min(total_blocks, max_in_flight + 1) * block_bytes
+                + int(min(workers, total_blocks) * block_bytes * factor))
+
+    if not fits:
+        warnings.append("Nem um bloco cabe na memória disponível; reduza --max-pixels ou a resolução")
+
+    plan = {
+        "Video": video,
+        "Machine": machine,
+        "Backend": backend,
+        "Source": source,
+        "Frames per Image": imageCount,
+        "Total Blocks": total_blocks,
+        "Block Bytes": block_bytes,
+        "Block Peak Bytes": block_peak,
+        "Workers": workers,
+        "Max In Flight": max_in_flight,
+        "Decode Threads": decode_threads,
+        "Predicted Peak Memory": peak,
+        "Warnings": warnings,
+    }
+
+    if measure:
+        rates = calibrate(video_path, W_res, H_res, escolha, source, gray, decode_threads)
+        decode_time = video["Frames"] / rates["Decode FPS"]
+        hash_time = video["Frames"] * rates["Hash Seconds per Frame"]
+        last_block = block_frames * rates["Hash Seconds per Frame"]
+        if backend == 'process':
+            # Cada processo decodifica o seu bloco; as threads do codec são divididas
+            runtime = (decode_time + hash_time) / workers + last_block
+        elif backend == 'serial':
+            runtime = decode_time + hash_time
+        else:
+            # Decodificação e hash em paralelo; o último bloco só começa no fim do vídeo
+            runtime = max(decode_time, hash_time / workers) + last_block
+        plan.update(rates)
+        plan["Predicted Runtime"] = runtime
+
+    return plan
+
+def _mib(n):
+    return f"{n / (1024 * 1024):.0f} MiB"
+
+def print_plan(plan):
+    video = plan["Video"]
+    machine = plan["Machine"]
+    print("\033[92mPlan (dry run)\033[0m")
+    print("\033[92mVideo:\033[0m \033[91m", f"{video['Width']}x{video['Height']} {video['FPS']:.2f} fps",
+          f"{video['Frames']} frames {video['Codec']}", "\033[0m")
+    print("\033[92mMachine:\033[0m \033[91m", f"{machine['Physical Cores']} cores / {machine['Logical Cores']} threads",
+          f"{_mib(machine['Available Memory'])} available", "\033[0m")
+    print("\033[92mBackend:\033[0m \033[91m", plan["Backend"], "/", plan["Source"], "\033[0m")
+    print("\033[92mFrames per Image:\033[0m \033[91m", plan["Frames per Image"], "\033[0m")
+    print("\033[92mTotal Blocks:\033[0m \033[91m", plan["Total Blocks"], "\033[0m")
+    print("\033[92mBlock Size:\033[0m \033[91m", _mib(plan["Block Bytes"]), f"(pico {_mib(plan['Block Peak Bytes'])})", "\033[0m")
+    print("\033[92mWorkers:\033[0m \033[91m", plan["Workers"], "\033[0m")
+    print("\033[92mMax In Flight:\033[0m \033[91m", plan["Max In Flight"], "\033[0m")
+    print("\033[92mDecode Threads:\033[0m \033[91m", plan["Decode Threads"], "\033[0m")
+    print("\033[92mPredicted Peak Memory:\033[0m \033[91m", _mib(plan["Predicted Peak Memory"]), "\033[0m")
+    if "Predicted Runtime" in plan:
+        print("\033[92mDecode FPS:\033[0m \033[91m", f"{plan['Decode FPS']:.1f}", "\033[0m")
+        print("\033[92mPredicted Runtime:\033[0m \033[91m", f"{plan['Predicted Runtime']:.1f} s", "\033[0m")
+    for warning in plan["Warnings"]:
+        print(f"\033[91mAviso: {warning}\033[0m")
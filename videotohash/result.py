@@ -0,0 +1,61 @@
+"""Leitura e escrita do resultado.json (mesmo formato do VideoToHashMTJson.py)."""
+import os
+import json
+
+from .config import HASH_METHODS
+
+# Valores de resultado.json sem "Hash Method", "Color Mode" ou "Source": o
+# VideoToHashMTJson.py usa sempre pHash de frames BGR lidos pelo OpenCV
+LEGACY_HASH_METHOD = 'phash'
+LEGACY_COLOR_MODE = 'bgr'
+LEGACY_SOURCE = 'opencv'
+
+def hash_method(escolha, backend=None):
+    """
+    Nome do método de hash gravado no resultado.json ('phash', 'ahash' ou 'dhash').
+
+    O backend dask calcula o Hash a partir de parciais e não do JPEG do mosaico
+    inteiro, então ganha o sufixo '-dask' e não é comparado com os outros.
+    """
+    name = next(name for name, value in HASH_METHODS.items() if value == escolha)
+    return f'{name}-dask' if backend == 'dask' else name
+
+def color_mode(gray):
+    """Valor de "Color Mode" no resultado.json; --gray muda os hashes (até ~0,06)."""
+    return 'gray' if gray else 'bgr'
+
+def result_hash_method(resultado):
+    return resultado.get("Hash Method", LEGACY_HASH_METHOD)
+
+def result_color_mode(resultado):
+    return resultado.get("Color Mode", LEGACY_COLOR_MODE)
+
+def result_source(resultado):
+    return resultado.get("Source", LEGACY_SOURCE)
+
+def build_result(W_res, H_res, imageCount, total_frames, hashes, method=LEGACY_HASH_METHOD, gray=False,
+                 source=LEGACY_SOURCE):
+    imageCount = int(imageCount)
+    return {
+        "Max Pixels": W_res * H_res * imageCount,
+        "Resolution Size": f"{W_res} x {H_res}",
+        "Frames per Image": imageCount,
+        "Calculation": f"{W_res} x {H_res} x {imageCount} = {W_res * H_res * imageCount}",
+        "Total Video Frames": total_frames,
+        "Total Blocks": len(hashes),
+        "Hash Method": method,
+        "Color Mode": color_mode(gray),
+        "Source": source,
+        "Hashes": hashes
+    }
+
+def write_result(out_video_path, resultado, name='resultado.json'):
+    os.makedirs(out_video_path, exist_ok=True)
+    path = os.path.join(out_video_path, name)
+    with open(path, 'w') as json_file:
+        json.dump(resultado, json_file, indent=4)
+    return path
+
+def load_result(path):
+    with open(path) as json_file:
+        return json.load(json_file)
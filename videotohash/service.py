@@ -0,0 +1,249 @@
+"""
+Serviço residente de hash: módulos importados uma vez, pool aquecido e fila de jobs.
+"""
+import json
+import asyncio
+import threading
+import concurrent.futures
+import cv2
+import numpy as np
+import psutil
+import time
+
+from .config import (MAX_PIXELS, W_RES, H_RES, NUM_COLUMNS, MOSAIC_MEMORY_FACTOR, frames_per_image,
+                     default_workers)
+from .mosaic import create_image_and_hash
+
+# Workers de hash compartilhados por todos os jobs do serviço
+MAX_WORKERS = default_workers()
+# Quantos vídeos podem ser decodificados ao mesmo tempo
+MAX_JOBS = 2
+# Memória máxima (bytes) ocupada por blocos em voo (frames e mosaico), somando todos os jobs
+MEMORY_BUDGET = psutil.virtual_memory().available // 2
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+
+class MemoryBudget:
+    """
+    Orçamento de memória compartilhado entre jobs.
+
+    Cada bloco reserva os bytes dos seus frames e do mosaico antes de começar a ser
+    lido e libera depois que o hash é calculado. Um bloco maior que o orçamento inteiro
+    só é admitido quando nada mais está reservado, para nunca travar.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes):
+        nbytes = min(nbytes, self.capacity)
+        with self.cond:
+            while self.used + nbytes > self.capacity:
+                self.cond.wait()
+            self.used += nbytes
+        return nbytes
+
+    def release(self, nbytes):
+        with self.cond:
+            self.used -= nbytes
+            self.cond.notify_all()
+
+
+def warm_up(executor, workers):
+    """
+    Aquece os workers: o imagehash só importa o scipy.fftpack na primeira
+    chamada do phash, e o cv2 inicializa seus buffers no primeiro resize/imencode.
+    """
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    futures = [executor.submit(create_image_and_hash, [cv2.resize(frame, (16, 16))], 1, '1')
+               for _ in range(workers)]
+    concurrent.futures.wait(futures)
+
+
+def run_job(job, executor, budget, emit, cancelled=None):
+    """
+    Decodifica um vídeo e envia cada bloco para o pool de hash.
+
+    Roda em uma thread própria (o cv2.VideoCapture bloqueia). Cada resultado é
+    entregue por emit(dict) assim que o bloco termina, sem esperar o vídeo todo.
+
+    Parâmetros:
+    - job: dict com "video" e, opcionalmente, "W_res", "H_res", "max_pixels", "escolha".
+    - executor: ThreadPoolExecutor compartilhado com os workers já aquecidos.
+    - budget: MemoryBudget compartilhado entre os jobs.
+    - emit: função chamada com cada mensagem de resultado.
+    - cancelled: threading.Event; se for setado (ex. o cliente desconectou), a
+      decodificação para antes do próximo bloco.
+
+    Retorna:
+    - Número de blocos processados.
+    """
+    W_res = int(job.get("W_res", W_RES))
+    H_res = int(job.get("H_res", H_RES))
+    max_pixels = int(job.get("max_pixels", MAX_PIXELS))
+    escolha = str(job.get("escolha", '1'))
+    num_columns = NUM_COLUMNS
+    imageCount = frames_per_image(W_res, H_res, max_pixels)
+    # Frames do bloco mais o que create_image_and_hash aloca enquanto o hash é calculado
+    block_bytes = int(imageCount * W_res * H_res * 3 * (1 + MOSAIC_MEMORY_FACTOR))
+
+    cap = cv2.VideoCapture(job["video"])
+    if not cap.isOpened():
+        raise RuntimeError(f"Erro ao abrir o vídeo: {job['video']}")
+
+    def hash_block(frames, p, reserved):
+        # O resultado é emitido dentro da própria tarefa, então quando o future
+        # termina a mensagem do bloco já foi enviada
+        try:
+            hash_pointer, img_hash = create_image_and_hash(frames, num_columns, escolha)
+            emit({"Block": p, "HashPointer": hash_pointer, "Hash": img_hash})
+        except Exception as e:
+            emit({"Block": p, "Error": str(e)})
+        finally:
+            frames.clear()
+            budget.release(reserved)
+
+    futures = []
+    p = 0
+    try:
+        while not (cancelled and cancelled.is_set()):
+            reserved = budget.acquire(block_bytes)
+            frames = []
+            while len(frames) < imageCount:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(cv2.resize(frame, (W_res, H_res)))
+            if not frames:
+                budget.release(reserved)
+                break
+            futures.append(executor.submit(hash_block, frames, p, reserved))
+            p += 1
+            if len(frames) < imageCount:
+                break
+    finally:
+        cap.release()
+        concurrent.futures.wait(futures)
+
+    return p
+
+
+class HashService:
+    """
+    Serviço residente: mantém os módulos importados e o pool de hash aquecido,
+    e atende jobs por um socket TCP local.
+
+    Protocolo (uma linha JSON por mensagem):
+    - cliente -> serviço: {"video": "caminho.mp4", "W_res": 640, "H_res": 360, ...}
+    - serviço -> cliente: {"Block": p, "HashPointer": ..., "Hash": ...} para cada bloco,
+      na ordem em que terminam, e por fim {"Done": true, "Total Blocks": n, "Elapsed Time": s}
+      ou {"Done": true, "Error": "..."}.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_jobs=MAX_JOBS, memory_budget=MEMORY_BUDGET):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.decoders = concurrent.futures.ThreadPoolExecutor(max_workers=max_jobs)
+        self.jobs = asyncio.Semaphore(max_jobs)
+        self.budget = MemoryBudget(memory_budget)
+        warm_up(self.executor, max_workers)
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    job = json.loads(line)
+                    job["video"]
+                except (ValueError, KeyError, TypeError):
+                    writer.write(b'{"Done": true, "Error": "job invalido"}\n')
+                    await writer.drain()
+                    continue
+
+                queue = asyncio.Queue()
+                cancelled = threading.Event()
+
+                def emit(message):
+                    loop.call_soon_threadsafe(queue.put_nowait, message)
+
+                async with self.jobs:
+                    start = time.time()
+                    task = loop.run_in_executor(self.decoders, run_job, job, self.executor, self.budget, emit,
+                                                cancelled)
+                    task.add_done_callback(lambda _: emit(None))
+                    try:
+                        while True:
+                            message = await queue.get()
+                            if message is None:
+                                break
+                            writer.write(json.dumps(message).encode() + b'\n')
+                            await writer.drain()
+                    except ConnectionError:
+                        # Cliente desconectou: o decoder para antes do próximo bloco, e a vaga
+                        # do job só é liberada quando ele realmente terminar
+                        cancelled.set()
+                        await asyncio.gather(task, return_exceptions=True)
+                        return
+                    try:
+                        final = {"Done": True, "Total Blocks": task.result(), "Elapsed Time": time.time() - start}
+                    except Exception as e:
+                        final = {"Done": True, "Error": str(e)}
+                writer.write(json.dumps(final).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"\033[92mServiço ouvindo em:\033[0m \033[91m{host}:{port}\033[0m")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.decoders.shutdown()
+        self.executor.shutdown()
+
+
+async def submit_job(job, host=HOST, port=PORT):
+    """
+    Cliente: envia um job ao serviço e devolve as mensagens conforme chegam.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(json.dumps(job).encode() + b'\n')
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            yield message
+            if message.get("Done"):
+                break
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def main(host=HOST, port=PORT, max_workers=MAX_WORKERS, max_jobs=MAX_JOBS, memory_budget=MEMORY_BUDGET):
+    print("\033[92mSetup\033[0m")
+    print("\033[92mWorkers:\033[0m \033[91m", max_workers, "\033[0m")
+    print("\033[92mMax Jobs:\033[0m \033[91m", max_jobs, "\033[0m")
+    print("\033[92mMemory Budget:\033[0m \033[91m", memory_budget, "\033[0m")
+
+    service = HashService(max_workers, max_jobs, memory_budget)
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == '__main__':
+    main()
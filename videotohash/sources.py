@@ -0,0 +1,273 @@
+"""
+Fontes de frames: OpenCV (cv2.VideoCapture), um processo ffmpeg ou PyAV.
+
+Com a fonte ffmpeg o redimensionamento (e, opcionalmente, a conversão para tons de
+cinza e a redução de fps) acontece dentro do decoder, e os frames crus W_res x H_res
+são lidos do pipe com readinto direto em arrays NumPy pré-alocados, um por bloco,
+sem cópias intermediárias nem conversão para BGR em resolução cheia.
+
+Com a fonte pyav (pip install av) o decoder roda no processo, com threads de frame
+e de slice do codec (thread_count configurável). Em tons de cinza o plano Y do frame
+YUV é usado direto como array NumPy, sem conversão de cor; em BGR a conversão e a
+escala são feitas juntas pelo swscale já em W_res x H_res.
+
+Os hashes das fontes ffmpeg e pyav ficam muito próximos, mas não idênticos, aos da
+fonte OpenCV (as conversões de cor e o filtro de escala não são bit a bit iguais).
+"""
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+
+from .mosaic import iter_blocks, read_frames
+
+SOURCES = ('opencv', 'ffmpeg', 'pyav')
+FFMPEG_BIN = 'ffmpeg'
+# Frames por buffer quando a fonte é lida frame a frame (sem tamanho de bloco)
+FRAME_BATCH = 32
+# Formatos YUV planares cujo plano Y (pyav) pode ser lido direto
+PLANAR_YUV_8BIT = ('yuv420p', 'yuvj420p', 'yuv422p', 'yuvj422p', 'yuv444p', 'yuvj444p', 'nv12', 'nv21')
+PLANAR_YUV_16BIT = ('yuv420p10le', 'yuv422p10le', 'yuv444p10le', 'yuv420p12le', 'yuv422p12le', 'yuv444p12le')
+# Y em faixa limitada (16-235) -> faixa cheia, como o cinza do cv2.cvtColor de um BGR
+LIMITED_TO_FULL = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(np.uint8)
+# AVCOL_RANGE_JPEG: o plano Y já está em faixa cheia
+COLOR_RANGE_FULL = 2
+
+def ffmpeg_command(video_path, W_res, H_res, gray=False, fps=None, start_time=None, max_frames=None,
+                   input_args=(), loglevel='error', threads=None):
+    """Monta a linha de comando do ffmpeg que escreve frames crus no stdout."""
+    filters = []
+    if fps:
+        filters.append(f'fps={fps}')
+    # bilinear, como o cv2.resize padrão (INTER_LINEAR)
+    filters.append(f'scale={W_res}:{H_res}:flags=bilinear')
+
+    cmd = [FFMPEG_BIN, '-loglevel', loglevel]
+    if video_path not in ('-', 'pipe:0'):
+        cmd.append('-nostdin')
+    if start_time:
+        cmd += ['-ss', f'{start_time:.6f}']
+    if threads:
+        cmd += ['-threads', str(int(threads))]
+    cmd += list(input_args)
+    cmd += ['-i', 'pipe:0' if video_path == '-' else video_path, '-an', '-vf', ','.join(filters)]
+    if max_frames is not None:
+        cmd += ['-frames:v', str(max_frames)]
+    cmd += ['-f', 'rawvideo', '-pix_fmt', 'gray' if gray else 'bgr24', 'pipe:1']
+    return cmd
+
+def _readinto_exact(stream, view):
+    """Preenche view inteira a partir do stream; retorna False se o stream acabar antes."""
+    filled = 0
+    size = len(view)
+    while filled < size:
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+def read_raw_blocks(stream, W_res, H_res, gray, frames_per_buffer):
+    """
+    Lê frames crus do stream em arrays (n, H_res, W_res[, 3]) recém-alocados.
+
+    Cada frame é lido com readinto direto na sua fatia do array; o último array pode
+    ter menos de frames_per_buffer frames.
+    """
+    shape = (frames_per_buffer, H_res, W_res) if gray else (frames_per_buffer, H_res, W_res, 3)
+    while True:
+        # Um buffer novo por bloco: os anteriores ainda podem estar com os workers
+        block = np.empty(shape, dtype=np.uint8)
+        n = 0
+        while n < frames_per_buffer and _readinto_exact(stream, memoryview(block[n]).cast('B')):
+            n += 1
+        if n:
+            yield block[:n]
+        if n < frames_per_buffer:
+            return
+
+def ffmpeg_blocks(video_path, W_res, H_res, frames_per_buffer, gray=False, fps=None, start_time=None,
+                  max_frames=None, input_args=(), loglevel='error', stdin=None, threads=None, check=True):
+    """
+    Gerador de blocos de frames decodificados por um processo ffmpeg.
+
+    Parâmetros:
+    - video_path: Arquivo de entrada, ou '-' para o stdin.
+    - frames_per_buffer: Frames por bloco (normalmente imageCount).
+    - gray: Pede ao ffmpeg frames em tons de cinza (pix_fmt gray) em vez de BGR.
+    - fps: Se definido, aplica o filtro fps antes da escala.
+    - start_time, max_frames: Trecho a ler (segundos, quantidade de frames).
+    - input_args: Opções extras de entrada (ex. -follow para arquivos em gravação).
+    - threads: Threads do decoder (-threads); None deixa o ffmpeg decidir.
+    - check: Quando o pipe acaba porque o ffmpeg terminou, um código de saída diferente
+      de zero levanta RuntimeError com o stderr (senão um erro de decodificação viraria
+      um resultado truncado). False só para leituras em que o fim aparece como erro
+      (-follow com -rw_timeout).
+    """
+    cmd = ffmpeg_command(video_path, W_res, H_res, gray, fps, start_time, max_frames, input_args, loglevel,
+                         threads)
+    if stdin is None:
+        stdin = subprocess.DEVNULL if video_path != '-' else None
+    # stderr em arquivo: um pipe cheio de avisos travaria o ffmpeg enquanto lemos o stdout
+    with tempfile.TemporaryFile() as stderr:
+        # bufsize=0: o readinto vai direto do pipe para o array, sem o buffer do Python
+        proc = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr, bufsize=0)
+        try:
+            yield from read_raw_blocks(proc.stdout, W_res, H_res, gray, frames_per_buffer)
+            # Fim do pipe (e não o consumidor parando antes): o ffmpeg terminou sozinho
+            returncode = proc.wait()
+            if check and returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors='replace').strip()
+                raise RuntimeError(f"ffmpeg terminou com código {returncode} em {video_path}: {message}")
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+
+def ffmpeg_frames(video_path, W_res, H_res, **options):
+    """Mesmo que ffmpeg_blocks, mas frame a frame (cada frame é uma view do seu buffer)."""
+    for block in ffmpeg_blocks(video_path, W_res, H_res, FRAME_BATCH, **options):
+        yield from block
+
+def _luma(frame):
+    """Plano Y de um frame YUV planar como array (height, width), sem conversão de cor."""
+    plane = frame.planes[0]
+    if frame.format.name in PLANAR_YUV_8BIT:
+        data = np.frombuffer(plane, dtype=np.uint8).reshape(plane.height, plane.line_size)
+        return data[:, :plane.width]
+    if frame.format.name in PLANAR_YUV_16BIT:
+        # 10/12 bits em uint16 little-endian; os 8 bits mais significativos
+        bits = int(frame.format.name[7:9])
+        data = np.frombuffer(plane, dtype='<u2').reshape(plane.height, plane.line_size // 2)
+        return (data[:, :plane.width] >> (bits - 8)).astype(np.uint8)
+    return frame.to_ndarray(format='gray')
+
+def _pyav_decode_from(container, stream, start_frame):
+    """
+    Frames do stream a partir de start_frame, exatos.
+
+    O pts de cada frame inclui stream.start_time (ex. ~1,4 s em MPEG-TS), então o alvo é
+    start_time + start_frame / fps. O seek pode cair depois do alvo, ou até depois do
+    fim (keyframes em TS são achados por posição de bytes); nesse caso o seek é refeito
+    cada vez mais para trás, e se nem o início do stream chega ao alvo é um erro, em vez de um bloco
+    desalinhado.
+    """
+    rate = float(stream.average_rate or stream.guessed_rate)
+    origin = float((stream.start_time or 0) * stream.time_base)
+    target = origin + start_frame / rate
+    # Meio frame de margem para arredondamentos de pts
+    margin = 0.5 / rate
+    back = 0.0
+    while True:
+        seek_time = max(origin, target - margin - back)
+        if seek_time > origin:
+            container.seek(int(seek_time / stream.time_base), stream=stream)
+        else:
+            # Início do arquivo (em TS o seek até o pts inicial também pode passar do alvo)
+            container.seek(0)
+        landed = None
+        for frame in container.decode(stream):
+            if frame.time is None:
+                raise RuntimeError(f"Frame sem pts em {container.name}; o seek até o frame {start_frame} não é exato")
+            if landed is None:
+                landed = frame.time
+                if landed > target + margin:
+                    break
+            if frame.time < target - margin:
+                continue
+            yield frame
+        if landed is not None and landed <= target + margin:
+            return
+        if seek_time <= origin:
+            if landed is None:
+                # Stream vazio
+                return
+            raise RuntimeError(f"O seek em {container.name} não chega ao frame {start_frame} "
+                               f"(primeiro frame em {landed - origin:.3f}s)")
+        # O seek passou do alvo, ou do fim do arquivo (nenhum frame decodificado)
+        back = max(1.0, 2 * back)
+
+def pyav_blocks(video_path, W_res, H_res, frames_per_buffer, gray=False, start_frame=0, end_frame=None,
+                threads=None):
+    """
+    Gerador de blocos de frames decodificados pelo PyAV, em arrays pré-alocados como na fonte ffmpeg.
+
+    Parâmetros:
+    - gray: Usa o plano Y direto; só o redimensionamento (cv2.resize) e, em vídeos de
+      faixa limitada, a expansão para faixa cheia são feitos, já no tamanho final.
+    - start_frame/end_frame: Trecho a ler; o seek vai ao keyframe anterior e os frames
+      antes de start_frame são decodificados e descartados (ver _pyav_decode_from).
+    - threads: thread_count do codec; None/0 deixa o FFmpeg usar todos os núcleos.
+    """
+    import av
+
+    shape = (frames_per_buffer, H_res, W_res) if gray else (frames_per_buffer, H_res, W_res, 3)
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        # Threads de frame e de slice, conforme o codec suportar
+        stream.thread_type = 'AUTO'
+        stream.codec_context.thread_count = int(threads or 0)
+        frames = _pyav_decode_from(container, stream, start_frame) if start_frame else container.decode(stream)
+        remaining = None if end_frame is None else end_frame - start_frame
+
+        block = np.empty(shape, dtype=np.uint8)
+        n = 0
+        for frame in frames:
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                remaining -= 1
+            if gray:
+                cv2.resize(_luma(frame), (W_res, H_res), dst=block[n])
+                if frame.color_range != COLOR_RANGE_FULL and not frame.format.name.startswith('yuvj'):
+                    # Expandido depois da escala, em W_res x H_res e não na resolução cheia
+                    cv2.LUT(block[n], LIMITED_TO_FULL, dst=block[n])
+            else:
+                block[n] = frame.to_ndarray(width=W_res, height=H_res, format='bgr24', interpolation='BILINEAR')
+            n += 1
+            if n == frames_per_buffer:
+                yield block
+                # Um buffer novo por bloco: o anterior ainda pode estar com os workers
+                block = np.empty(shape, dtype=np.uint8)
+                n = 0
+        if n:
+            yield block[:n]
+
+def opencv_frames(video_path, W_res, H_res, gray=False, start_frame=0, end_frame=None, threads=None):
+    for frame in read_frames(video_path, W_res, H_res, start_frame, end_frame, threads):
+        yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if gray else frame
+
+def video_fps(video_path):
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps
+
+def read_blocks(video_path, W_res, H_res, imageCount, source='opencv', gray=False, fps=None,
+                start_frame=0, end_frame=None, threads=None):
+    """
+    Gerador de blocos de até imageCount frames da fonte escolhida.
+
+    start_frame/end_frame são índices de frame na taxa de saída (fps, se definido);
+    na fonte ffmpeg o seek é feito por tempo (-ss), preciso para vídeos de fps constante.
+    threads é o número de threads do decoder.
+    """
+    imageCount = int(imageCount)
+    if source == 'ffmpeg':
+        start_time = None
+        max_frames = None
+        if start_frame or end_frame is not None:
+            rate = fps or video_fps(video_path)
+            start_time = start_frame / rate if start_frame else None
+            max_frames = None if end_frame is None else end_frame - start_frame
+        return ffmpeg_blocks(video_path, W_res, H_res, imageCount, gray, fps, start_time, max_frames,
+                             threads=threads)
+    if source in ('opencv', 'pyav') and fps:
+        raise ValueError("O filtro de fps só está disponível na fonte ffmpeg")
+    if source == 'pyav':
+        return pyav_blocks(video_path, W_res, H_res, imageCount, gray, start_frame, end_frame, threads)
+    if source == 'opencv':
+        return iter_blocks(opencv_frames(video_path, W_res, H_res, gray, start_frame, end_frame, threads),
+                           imageCount)
+    raise ValueError(f"Fonte desconhecida: {source} (opções: {', '.join(SOURCES)})")
@@ -0,0 +1,165 @@
+"""
+Entrada em streaming: stdin/pipe, arquivo ainda sendo gravado ou diretório de segmentos.
+"""
+import os
+import re
+import sys
+import json
+import time
+import cv2
+
+from .config import MAX_PIXELS, W_RES, H_RES, frames_per_image
+from .backends.thread import encode_blocks
+from .mosaic import iter_blocks
+from .result import build_result, hash_method, write_result
+from .sources import ffmpeg_blocks
+
+# Extensões aceitas como segmentos em um diretório estilo HLS
+SEGMENT_EXTENSIONS = ('.ts', '.m4s', '.mp4', '.mkv')
+
+
+def blocks_from_pipe(source, W_res, H_res, imageCount, gray=False, fps=None, idle_timeout=10):
+    """
+    Lê blocos de frames já redimensionados de um processo ffmpeg (videotohash.sources).
+
+    Parâmetros:
+    - source: '-' para ler o stdin, ou o caminho de um arquivo que ainda está sendo
+      gravado (lido com -follow, até ficar idle_timeout segundos sem crescer).
+    - W_res, H_res: resolução de saída (o ffmpeg já entrega os frames nesse tamanho).
+    - imageCount: Frames por bloco; cada bloco sai assim que o último frame chega.
+    - idle_timeout: segundos sem dados novos para considerar a gravação encerrada.
+
+    Retorna:
+    - Gerador de arrays (n, H_res, W_res[, 3]).
+    """
+    if source == '-':
+        return ffmpeg_blocks('-', W_res, H_res, imageCount, gray, fps, stdin=sys.stdin.buffer)
+    # Com -follow o fim da gravação aparece como erro de leitura (rw_timeout), que é esperado
+    return ffmpeg_blocks(f'file:{source}', W_res, H_res, imageCount, gray, fps,
+                         input_args=['-follow', '1', '-rw_timeout', str(int(idle_timeout * 1000000))],
+                         loglevel='fatal', check=False)
+
+
+def natural_key(name):
+    """Chave de ordenação que compara os números do nome como números (seg2 < seg10)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def read_playlists(directory):
+    """
+    Segmentos listados nas playlists .m3u8 do diretório, na ordem da playlist.
+
+    Retorna:
+    - (lista de nomes de arquivo, True se alguma playlist tem #EXT-X-ENDLIST)
+    """
+    entries = []
+    ended = False
+    for name in sorted(n for n in os.listdir(directory) if n.endswith('.m3u8')):
+        with open(os.path.join(directory, name)) as playlist:
+            for line in playlist:
+                line = line.strip()
+                if line == '#EXT-X-ENDLIST':
+                    ended = True
+                elif line and not line.startswith('#'):
+                    segment = os.path.basename(line.split('?')[0])
+                    if segment not in entries:
+                        entries.append(segment)
+    return entries, ended
+
+
+def segment_order(directory):
+    """
+    Segmentos do diretório em ordem de reprodução: primeiro os listados na playlist,
+    na ordem dela, depois os demais em ordem natural (seg2 antes de seg10).
+
+    Retorna:
+    - (lista de nomes, True se a playlist marca #EXT-X-ENDLIST)
+    """
+    on_disk = [n for n in os.listdir(directory) if n.endswith(SEGMENT_EXTENSIONS)]
+    entries, ended = read_playlists(directory)
+    listed = [n for n in entries if n in on_disk]
+    rest = sorted((n for n in on_disk if n not in set(listed)), key=natural_key)
+    return listed + rest, ended
+
+
+def frames_from_segments(directory, W_res, H_res, gray=False, idle_timeout=10, poll_interval=0.5):
+    """
+    Lê frames de um diretório de segmentos (estilo HLS) que ainda está recebendo arquivos.
+
+    Os segmentos são lidos na ordem da playlist (.m3u8) ou, sem ela, em ordem natural
+    dos nomes (segment_order). Um segmento só é lido quando já existe um segmento
+    posterior ou quando a playlist marca #EXT-X-ENDLIST, para não ler um arquivo pela
+    metade. Termina na ENDLIST ou após idle_timeout segundos sem segmentos novos.
+
+    Retorna:
+    - Gerador de frames BGR (H_res x W_res x 3), ou em tons de cinza se gray.
+    """
+    done = set()
+    idle = False
+    last_change = time.time()
+    while True:
+        names, ended = segment_order(directory)
+        ended = ended or idle
+        pending = [n for n in names if n not in done]
+        ready = pending if ended else pending[:-1]
+
+        for name in ready:
+            cap = cv2.VideoCapture(os.path.join(directory, name))
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame = cv2.resize(frame, (W_res, H_res))
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if gray else frame
+            cap.release()
+            done.add(name)
+            last_change = time.time()
+
+        if ended and len(ready) == len(pending):
+            break
+        if time.time() - last_change > idle_timeout:
+            # Sem segmentos novos: o último pendente também é considerado completo
+            if pending and not ready:
+                idle = True
+                continue
+            break
+        if not ready:
+            time.sleep(poll_interval)
+
+
+def main(in_video_path='-', out_video_path='playback', W_res=W_RES, H_res=H_RES, max_pixels=MAX_PIXELS,
+         escolha='1', workers=None, gray=False, fps=None):
+    """
+    '-' lê do stdin; um diretório é lido como segmentos; um arquivo é seguido enquanto cresce.
+    """
+    imageCount = frames_per_image(W_res, H_res, max_pixels)
+
+    print("\033[92mSetup\033[0m", file=sys.stderr)
+    print("\033[92mMax Pixels:\033[0m \033[91m", max_pixels, "\033[0m", file=sys.stderr)
+    print("\033[92mResolution Size:\033[0m \033[91m", W_res, "x", H_res, "\033[0m", file=sys.stderr)
+    print("\033[92mFrames per Image:\033[0m \033[91m", imageCount, "\033[0m", file=sys.stderr)
+    print("\033[92mIn Video Path:\033[0m \033[91m", in_video_path, "\033[0m", file=sys.stderr)
+    print("\033[92mOut Video Path:\033[0m \033[91m", out_video_path, "\033[0m", file=sys.stderr)
+
+    if os.path.isdir(in_video_path):
+        if fps:
+            raise ValueError("O filtro de fps não se aplica a diretórios de segmentos")
+        blocks = iter_blocks(frames_from_segments(in_video_path, W_res, H_res, gray), imageCount)
+    else:
+        blocks = blocks_from_pipe(in_video_path, W_res, H_res, imageCount, gray, fps)
+
+    def on_block(p, hash_pointer, img_hash):
+        # Uma linha JSON por bloco no stdout, assim que o bloco fica pronto
+        print(json.dumps({"Block": p, "HashPointer": hash_pointer, "Hash": img_hash}), flush=True)
+
+    start = time.time()
+    hashes, total_frames = encode_blocks(blocks, escolha, on_block, workers)
+    end = time.time()
+
+    # Diretórios de segmentos são lidos pelo OpenCV; stdin e arquivos em gravação, pelo ffmpeg
+    source = 'opencv' if os.path.isdir(in_video_path) else 'ffmpeg'
+    write_result(out_video_path, build_result(W_res, H_res, imageCount, total_frames, hashes, hash_method(escolha),
+                                              gray, source))
+
+    print("\033[92mTotal Video Frames:\033[0m \033[91m", total_frames, "\033[0m", file=sys.stderr)
+    print("\033[92mElapsed Time:\033[0m \033[91m", end - start, "\033[0m", file=sys.stderr)
@@ -0,0 +1,122 @@
+"""
+Armazenamento dos mosaicos em tiles, para auditoria.
+
+Em vez de um frames_mosaic_{p}.jpg de ~168 megapixels codificado em uma thread só,
+cada bloco vira um frames_mosaic_{p}.zip com um tile por frame (W_res x H_res) e um
+index.json. Os tiles são codificados em paralelo (cv2.imencode libera o GIL), um
+frame pode ser lido sozinho sem decodificar o resto, e o mosaico é remontado com
+build_mosaic exatamente no layout atual, sem Image.MAX_IMAGE_PIXELS nem avisos de
+DecompressionBomb.
+
+Formatos dos tiles:
+- 'png': sem perdas; o mosaico remontado é idêntico ao que foi hasheado, então
+  hash() reproduz o HashPointer/Hash do resultado.json.
+- 'jpg': mesma qualidade do cv2.imwrite antigo, bem mais rápido e menor, com perdas.
+"""
+import os
+import json
+import zipfile
+import concurrent.futures
+import cv2
+import numpy as np
+
+from .config import NUM_COLUMNS
+from .mosaic import build_mosaic, create_image_and_hash
+
+TILE_FORMATS = ('png', 'jpg')
+INDEX_NAME = 'index.json'
+# Compressão 1: bem mais rápida que o padrão (3) e quase do mesmo tamanho
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+JPG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 95]
+
+def archive_path(out_dir, p):
+    return os.path.join(out_dir, f'frames_mosaic_{p}.zip')
+
+def tile_name(i, tile_format):
+    return f'frame_{i:05d}.{tile_format}'
+
+def _encode_tile(frame, tile_format):
+    params = PNG_PARAMS if tile_format == 'png' else JPG_PARAMS
+    success, buffer = cv2.imencode(f'.{tile_format}', frame, params)
+    if not success:
+        raise RuntimeError("Erro ao codificar o tile")
+    return buffer
+
+def write_tiles(path, frames, num_columns=NUM_COLUMNS, tile_format='png', workers=None):
+    """
+    Grava os frames de um bloco como tiles em um zip.
+
+    Os tiles são codificados em paralelo por workers threads (padrão: os.cpu_count())
+    e gravados em ordem; o zip usa ZIP_STORED, já que PNG/JPEG já são comprimidos.
+    O arquivo só aparece com o nome final depois de completo.
+    """
+    if tile_format not in TILE_FORMATS:
+        raise ValueError(f"Formato de tile desconhecido: {tile_format} (opções: {', '.join(TILE_FORMATS)})")
+    H_res, W_res = frames[0].shape[:2]
+    index = {
+        "Frames": len(frames),
+        "Resolution Size": f"{W_res} x {H_res}",
+        "Channels": 1 if frames[0].ndim == 2 else frames[0].shape[2],
+        "Num Columns": num_columns,
+        "Tile Format": tile_format,
+    }
+    tmp_path = path + '.tmp'
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor, \
+            zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr(INDEX_NAME, json.dumps(index, indent=4))
+        buffers = executor.map(_encode_tile, frames, [tile_format] * len(frames))
+        for i, buffer in enumerate(buffers):
+            archive.writestr(tile_name(i, tile_format), buffer.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+def archive_block(out_dir, p, frames, num_columns=NUM_COLUMNS, tile_format='png', workers=None):
+    """Grava o bloco p em out_dir/frames_mosaic_{p}.zip."""
+    os.makedirs(out_dir, exist_ok=True)
+    return write_tiles(archive_path(out_dir, p), frames, num_columns, tile_format, workers)
+
+class TileArchive:
+    """
+    Leitura de um frames_mosaic_{p}.zip.
+
+        with TileArchive('playback/mosaics/frames_mosaic_3.zip') as tiles:
+            frame = tiles.frame(100)     # só esse tile é lido e decodificado
+            mosaic = tiles.mosaic()      # layout igual ao do frames_mosaic_{p}.jpg
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.index = json.loads(self.zip.read(INDEX_NAME))
+
+    def __len__(self):
+        return self.index["Frames"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.zip.close()
+
+    def frame(self, i):
+        """Frame i do bloco (BGR, ou 2D se o bloco estava em tons de cinza)."""
+        if not 0 <= i < len(self):
+            raise IndexError(f"Frame {i} fora do bloco ({len(self)} frames)")
+        data = np.frombuffer(self.zip.read(tile_name(i, self.index["Tile Format"])), dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+
+    def frames(self, workers=None):
+        """Todos os frames, decodificados em paralelo."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            return list(executor.map(self.frame, range(len(self))))
+
+    def mosaic(self, workers=None):
+        """Mosaico remontado no layout atual (num_columns faixas empilhadas)."""
+        return build_mosaic(self.frames(workers), self.index["Num Columns"])
+
+    def hash(self, escolha='1', workers=None):
+        """(HashPointer, Hash) recalculados a partir dos tiles."""
+        return create_image_and_hash(self.frames(workers), self.index["Num Columns"], escolha)
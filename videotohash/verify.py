@@ -0,0 +1,216 @@
+"""
+Verificação de um vídeo suspeito contra um resultado.json de referência.
+
+Cada bloco é decodificado (com seek até o seu primeiro frame), hasheado e comparado
+com o bloco de mesmo índice da referência assim que fica pronto. Os resultados
+alimentam um teste sequencial (SPRT de Wald), e a decodificação para assim que o
+teste atinge a confiança pedida, seja para "match" ou para "mismatch".
+
+Na ordem 'spread' os blocos são visitados espalhados pela linha do tempo (início,
+fim, meio, quartos, ...), então poucos blocos já cobrem o vídeo inteiro.
+"""
+import math
+import concurrent.futures
+from collections import deque
+
+from .config import NUM_COLUMNS, HASH_METHODS, BLOCK_THRESHOLD, default_workers
+from .mosaic import create_image_and_hash
+from .planner import MEMORY_SAFETY, PROCESS_BASE_BYTES, make_plan
+from .result import (color_mode, hash_method, load_result, result_color_mode, result_hash_method,
+                     result_source)
+from .sources import read_blocks
+
+ORDERS = ('spread', 'sequential')
+CONFIDENCE = 0.99
+# Probabilidade de um bloco bater quando o vídeo é o mesmo (MATCH_RATE) ou não é (MISMATCH_RATE)
+MATCH_RATE = 0.9
+MISMATCH_RATE = 0.1
+
+def hamming_distance(hash1, hash2):
+    """Distância de Hamming normalizada entre dois hashes em hexadecimal."""
+    bits = 4 * max(len(hash1), len(hash2))
+    return bin(int(hash1, 16) ^ int(hash2, 16)).count('1') / bits
+
+def spread_order(total_blocks):
+    """Índices 0..total_blocks-1 começando pelas pontas e bissectando os intervalos."""
+    if total_blocks <= 0:
+        return []
+    order = [0] if total_blocks == 1 else [0, total_blocks - 1]
+    intervals = deque([(0, total_blocks - 1)])
+    while intervals:
+        lo, hi = intervals.popleft()
+        if hi - lo < 2:
+            continue
+        mid = (lo + hi) // 2
+        order.append(mid)
+        intervals.append((lo, mid))
+        intervals.append((mid, hi))
+    return order
+
+class SequentialTest:
+    """
+    Teste sequencial da razão de verossimilhança: cada bloco igual soma
+    log(MATCH_RATE / MISMATCH_RATE) e cada bloco diferente soma
+    log((1 - MATCH_RATE) / (1 - MISMATCH_RATE)). A decisão sai quando a soma passa
+    de ±log(confidence / (1 - confidence)).
+    """
+
+    def __init__(self, confidence=CONFIDENCE, match_rate=MATCH_RATE, mismatch_rate=MISMATCH_RATE):
+        # Com confidence <= 0,5 o limite fica <= 0 e a decisão sai sem nenhum bloco
+        if not 0.5 < confidence < 1:
+            raise ValueError(f"A confiança precisa estar entre 0,5 e 1 (exclusivo): {confidence}")
+        self.limit = math.log(confidence / (1 - confidence))
+        self.match_step = math.log(match_rate / mismatch_rate)
+        self.mismatch_step = math.log((1 - match_rate) / (1 - mismatch_rate))
+        self.score = 0.0
+
+    def update(self, matched):
+        self.score += self.match_step if matched else self.mismatch_step
+        return self.decision
+
+    @property
+    def decision(self):
+        if self.score >= self.limit:
+            return 'match'
+        if self.score <= -self.limit:
+            return 'mismatch'
+        return None
+
+def parse_resolution(resultado):
+    """(W_res, H_res) a partir de "Resolution Size" ("640 x 360")."""
+    W_res, H_res = (int(v) for v in resultado["Resolution Size"].split('x'))
+    return W_res, H_res
+
+def hash_block(video_path, index, W_res, H_res, imageCount, escolha, source, gray, decode_threads):
+    """Decodifica só o bloco index e retorna (HashPointer, Hash), ou None se o vídeo acabou antes."""
+    start = index * imageCount
+    frames = next(iter(read_blocks(video_path, W_res, H_res, imageCount, source, gray,
+                                   start_frame=start, end_frame=start + imageCount, threads=decode_threads)), None)
+    if frames is None or not len(frames):
+        return None
+    return create_image_and_hash(frames, NUM_COLUMNS, escolha)
+
+def memory_workers(video_path, W_res, H_res, imageCount, escolha, source, gray):
+    """
+    Quantos blocos cabem na memória ao mesmo tempo: cada worker guarda os frames do
+    seu bloco e monta o mosaico, ou seja, o pico por bloco do planner.
+    """
+    plan = make_plan(video_path, W_res, H_res, imageCount, escolha, 'thread', source, gray, measure=False)
+    budget = int(plan["Machine"]["Available Memory"] * MEMORY_SAFETY) - PROCESS_BASE_BYTES
+    return max(1, budget // plan["Block Peak Bytes"])
+
+def compare_block(index, reference, computed):
+    """Comparação de um bloco no formato do Hashes/OxP.json."""
+    if computed is None:
+        # O vídeo suspeito é mais curto que a referência
+        return {"Index": index, "HashPointer1": reference["HashPointer"], "HashPointer2": None,
+                "HashPointerNormalizedHammingDistance": 1.0, "Hash1": reference["Hash"], "Hash2": None,
+                "NormalizedHammingDistance": 1.0}
+    hash_pointer, img_hash = computed
+    return {
+        "Index": index,
+        "HashPointer1": reference["HashPointer"],
+        "HashPointer2": hash_pointer,
+        "HashPointerNormalizedHammingDistance": hamming_distance(reference["HashPointer"], hash_pointer),
+        "Hash1": reference["Hash"],
+        "Hash2": img_hash,
+        "NormalizedHammingDistance": hamming_distance(reference["Hash"], img_hash),
+    }
+
+def verify(video_path, reference, escolha=None, order='spread', confidence=CONFIDENCE,
+           block_threshold=BLOCK_THRESHOLD, source=None, gray=None, workers=None, decode_threads=None,
+           on_block=None):
+    """
+    Compara video_path com a referência, parando assim que houver confiança suficiente.
+
+    Parâmetros:
+    - reference: Caminho de um resultado.json ou o dict já carregado. A resolução e os
+      frames por imagem vêm dele, para que os blocos sejam os mesmos.
+    - escolha: Método de hash ('1' phash, '2' average, '3' dhash); None usa o "Hash
+      Method" da referência. Um método diferente do da referência é recusado.
+    - order: 'spread' (espalhado pela linha do tempo) ou 'sequential'.
+    - confidence: Confiança do teste sequencial para parar (ex. 0.99), entre 0,5 e 1.
+    - block_threshold: Distância normalizada máxima para um bloco contar como igual.
+    - source, gray: Fonte e tons de cinza; None usa o "Source" e o "Color Mode" da
+      referência. Valores diferentes dos da referência são recusados.
+    - workers: Blocos decodificados e hasheados ao mesmo tempo (padrão: núcleos
+      físicos), limitado pelos blocos que cabem na memória disponível.
+    - on_block(comparison): chamado a cada bloco comparado.
+
+    Retorna:
+    - dict com Decision ('match' ou 'mismatch'), Early Exit, os blocos verificados e as
+      comparações. Se os blocos acabarem antes da confiança, a decisão é o lado para
+      onde o teste pendeu, com Early Exit False.
+    """
+    if not isinstance(reference, dict):
+        reference = load_result(reference)
+    if order not in ORDERS:
+        raise ValueError(f"Ordem desconhecida: {order} (opções: {', '.join(ORDERS)})")
+    method = result_hash_method(reference)
+    escolha = escolha or HASH_METHODS.get(method, '1')
+    if hash_method(escolha) != method:
+        # O backend dask não reproduz bit a bit o Hash do JPEG calculado aqui
+        hint = ("gere a referência com o backend serial, thread ou process" if method not in HASH_METHODS
+                else f"verifique com o método {method}")
+        raise ValueError(f"A referência usa o método {method} e a verificação calcularia "
+                         f"{hash_method(escolha)}; {hint}")
+    # Tons de cinza e a fonte também mudam os hashes: vêm da referência
+    reference_gray = result_color_mode(reference) == 'gray'
+    gray = reference_gray if gray is None else gray
+    if gray != reference_gray:
+        raise ValueError(f"A referência está em {result_color_mode(reference)} e a verificação usaria "
+                         f"{color_mode(gray)}")
+    reference_source = result_source(reference)
+    source = source or reference_source
+    if source != reference_source:
+        raise ValueError(f"A referência foi decodificada pela fonte {reference_source} e a verificação usaria "
+                         f"{source}; as fontes não dão hashes idênticos")
+    W_res, H_res = parse_resolution(reference)
+    imageCount = int(reference["Frames per Image"])
+    ref_hashes = reference["Hashes"]
+    indices = spread_order(len(ref_hashes)) if order == 'spread' else list(range(len(ref_hashes)))
+
+    test = SequentialTest(confidence)
+    comparisons = []
+    workers = min(workers or default_workers(),
+                  memory_workers(video_path, W_res, H_res, imageCount, escolha, source, gray))
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = iter(indices)
+        running = {}
+
+        def submit_next():
+            index = next(pending, None)
+            if index is not None:
+                running[executor.submit(hash_block, video_path, index, W_res, H_res, imageCount, escolha,
+                                        source, gray, decode_threads)] = index
+
+        for _ in range(workers):
+            submit_next()
+        while running and test.decision is None:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                comparison = compare_block(index, ref_hashes[index], future.result())
+                comparison["Match"] = comparison["NormalizedHammingDistance"] <= block_threshold
+                comparisons.append(comparison)
+                test.update(comparison["Match"])
+                if on_block:
+                    on_block(comparison)
+                if test.decision is None:
+                    submit_next()
+    finally:
+        # Blocos ainda não iniciados são descartados; os em andamento terminam sozinhos
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return {
+        "Decision": test.decision or ('match' if test.score > 0 else 'mismatch'),
+        "Early Exit": test.decision is not None and len(comparisons) < len(ref_hashes),
+        "Confidence": confidence,
+        "Block Threshold": block_threshold,
+        "Order": order,
+        "Workers": workers,
+        "Blocks Checked": len(comparisons),
+        "Total Blocks": len(ref_hashes),
+        "Comparisons": comparisons,
+    }